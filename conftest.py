@@ -0,0 +1,9 @@
+"""
+conftest.py
+Puts the dispatch_optimizer modules on sys.path so tests import them as top-level packages, as the app does.
+"""
+
+import os
+import sys
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), 'dispatch_optimizer'))
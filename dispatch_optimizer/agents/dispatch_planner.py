@@ -3,23 +3,164 @@ dispatch_planner.py
 True dispatch planning with route optimization, vehicle assignment, and delivery scheduling.
 """
 
+import math
 import numpy as np
 from datetime import datetime, timedelta
-import random
 from typing import List, Dict, Tuple
 import pandas as pd
+from scipy.spatial import cKDTree
 
 FUEL_PRICE_PER_LITER = 95  # INR per liter (Indian diesel price)
+MILES_TO_KM = 1.60934
+AVERAGE_SPEED_MPH = 30  # Assumed average driving speed
+KDTREE_MIN_STOPS = 2500  # Routes at least this long use a KD-tree for nearest-neighbor construction
+TWO_OPT_MAX_STOPS = 1000  # Longer routes keep their nearest-neighbor order; each 2-opt pass is quadratic
+TWO_OPT_MAX_PASSES = 10  # Upper bound on improvement passes over a tour
+PRIORITY_SCORES = {'High': 3, 'Medium': 2, 'Low': 1}
+
+def compute_costs(distance_km, fuel_efficiency, operating_cost_per_km, hourly_rate):
+    """
+    Compute route costs from distance and vehicle/driver rates.
+    Works element-wise on NumPy arrays as well as on scalars.
+    Returns:
+        tuple: (fuel_cost, operating_cost, driver_cost, total_cost)
+    """
+    fuel_cost = (distance_km / fuel_efficiency) * FUEL_PRICE_PER_LITER
+    operating_cost = distance_km * operating_cost_per_km
+    driver_cost = (distance_km / AVERAGE_SPEED_MPH) * hourly_rate
+    return fuel_cost, operating_cost, driver_cost, fuel_cost + operating_cost + driver_cost
+
+def _kdtree_nearest_neighbor_order(coords: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Build a nearest-neighbor visiting order for one long route using a KD-tree built once.
+    Visited stops are skipped lazily: the tree is queried for a few candidates and k is
+    doubled only when all of them have already been visited.
+    Args:
+        coords (np.ndarray): (n, 2) delivery coordinates.
+    Returns:
+        tuple: (order, legs), where legs[i] is the distance travelled to reach stop order[i].
+    """
+    n = len(coords)
+    tree = cKDTree(coords)
+    visited = np.zeros(n, dtype=bool)
+    order = np.empty(n, dtype=np.intp)
+    legs = np.empty(n, dtype=np.float64)
+    current = np.zeros(2)  # Warehouse
+    for step in range(n):
+        k = min(8, n)
+        while True:
+            dists, idxs = tree.query(current, k=k)
+            dists, idxs = np.atleast_1d(dists), np.atleast_1d(idxs)
+            free = ~visited[idxs]
+            if free.any() or k == n:
+                break
+            k = min(2 * k, n)
+        first = int(free.argmax())
+        idx = int(idxs[first])
+        visited[idx] = True
+        order[step] = idx
+        legs[step] = dists[first]
+        current = coords[idx]
+    
+    return order, legs
+
+def _nearest_neighbor_orders(stop_coords: List[np.ndarray]) -> List[Tuple[np.ndarray, np.ndarray]]:
+    """
+    Build nearest-neighbor visiting orders for several routes at once, starting at the warehouse.
+    Routes are padded into a single (V, m, 2) array so each construction step advances every
+    route with one vectorized argmin instead of one Python loop per vehicle. Routes with at
+    least KDTREE_MIN_STOPS stops are built with a KD-tree instead.
+    Args:
+        stop_coords (list of np.ndarray): (n, 2) delivery coordinates for each route.
+    Returns:
+        list of tuple: (order, legs) per route, where legs[i] is the distance travelled to reach stop order[i].
+    """
+    if not stop_coords:
+        return []
+    # Long routes go through a KD-tree; the rest are advanced together below
+    long_routes = {v: _kdtree_nearest_neighbor_order(c) for v, c in enumerate(stop_coords)
+                   if len(c) >= KDTREE_MIN_STOPS}
+    if long_routes:
+        short = [v for v in range(len(stop_coords)) if v not in long_routes]
+        short_orders = dict(zip(short, _nearest_neighbor_orders([stop_coords[v] for v in short])))
+        return [long_routes[v] if v in long_routes else short_orders[v] for v in range(len(stop_coords))]
+    counts = np.array([len(c) for c in stop_coords])
+    n_routes, max_stops = len(stop_coords), int(counts.max())
+    coords = np.zeros((n_routes, max_stops, 2), dtype=np.float64)
+    for v, c in enumerate(stop_coords):
+        coords[v, :len(c)] = c
+    
+    rows = np.arange(n_routes)
+    visited = np.arange(max_stops)[None, :] >= counts[:, None]  # Padding is never visited
+    orders = np.zeros((n_routes, max_stops), dtype=np.intp)
+    legs = np.zeros((n_routes, max_stops), dtype=np.float64)
+    current = np.zeros((n_routes, 2), dtype=np.float64)  # Warehouse
+    for step in range(max_stops):
+        active = step < counts
+        # argmin of squared distance equals argmin of distance; only chosen legs need a sqrt
+        dist2 = (coords[:, :, 0] - current[:, :1])**2 + (coords[:, :, 1] - current[:, 1:])**2
+        dist2[visited] = np.inf
+        k = dist2.argmin(axis=1)
+        visited[rows[active], k[active]] = True
+        orders[:, step] = k
+        legs[:, step] = np.sqrt(np.where(active, dist2[rows, k], 0.0))
+        current = np.where(active[:, None], coords[rows, k], current)
+    
+    return [(orders[v, :counts[v]], legs[v, :counts[v]]) for v in range(n_routes)]
+
+def _product_volume(product: Dict) -> float:
+    """Length * Width * Height of a product, with missing dimensions counted as 0."""
+    return product.get('Length', 0) * product.get('Width', 0) * product.get('Height', 0)
+
+def _two_opt(order: np.ndarray, coords: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Improve a visiting order with 2-opt moves on the closed tour through the warehouse.
+    At most TWO_OPT_MAX_PASSES passes are made, and tours longer than TWO_OPT_MAX_STOPS
+    are returned unchanged.
+    Args:
+        order (np.ndarray): Initial visiting order (indices into coords).
+        coords (np.ndarray): (n, 2) delivery coordinates.
+    Returns:
+        tuple: (order, legs) for the improved tour, where legs[i] is the distance travelled to reach stop order[i].
+    """
+    n = len(order)
+    # Node 0 is the warehouse; the tour starts and ends there
+    nodes = np.vstack([np.zeros((1, 2)), coords])
+    tour = np.concatenate(([0], np.asarray(order) + 1, [0]))
+    
+    improved = n <= TWO_OPT_MAX_STOPS
+    passes = 0
+    while improved and passes < TWO_OPT_MAX_PASSES:
+        improved = False
+        passes += 1
+        for i in range(1, n):
+            # Gain of reversing tour[i..j] for every j > i at once
+            a, b = nodes[tour[i - 1]], nodes[tour[i]]
+            c, d = nodes[tour[i + 1:n + 1]], nodes[tour[i + 2:n + 2]]
+            delta = (np.hypot(*(c - a).T) + np.hypot(*(d - b).T)
+                     - np.hypot(*(b - a)) - np.hypot(*(d - c).T))
+            best = int(delta.argmin())
+            if delta[best] < -1e-9:
+                j = i + 1 + best
+                tour[i:j + 1] = tour[i:j + 1][::-1]
+                improved = True
+    
+    steps = nodes[tour[1:n + 1]] - nodes[tour[:n]]
+    return tour[1:n + 1] - 1, np.hypot(steps[:, 0], steps[:, 1])
 
 class DispatchPlanner:
-    def __init__(self):
+    def __init__(self, seed: int = None):
         self.vehicles = []
         self.drivers = []
         self.routes = []
+        self._vehicle_index: Dict[str, int] = {}
+        self._driver_index: Dict[str, int] = {}
+        self._rng = np.random.default_rng(seed)  # Single generator for all random draws
         
     def add_vehicle(self, vehicle_id: str, capacity_weight: float, capacity_volume: float, 
                    fuel_efficiency: float, operating_cost_per_km: float):
         """Add a vehicle to the fleet."""
+        self._vehicle_index[vehicle_id] = len(self.vehicles)
         self.vehicles.append({
             'id': vehicle_id,
             'capacity_weight': capacity_weight,
@@ -32,6 +173,7 @@ class DispatchPlanner:
     
     def add_driver(self, driver_id: str, name: str, max_hours: float, hourly_rate: float):
         """Add a driver to the team."""
+        self._driver_index[driver_id] = len(self.drivers)
         self.drivers.append({
             'id': driver_id,
             'name': name,
@@ -41,62 +183,78 @@ class DispatchPlanner:
             'available': True
         })
     
-    def calculate_distance(self, point1: Tuple[float, float], point2: Tuple[float, float]) -> float:
+    @staticmethod
+    def calculate_distance(point1: Tuple[float, float], point2: Tuple[float, float]) -> float:
         """Calculate Euclidean distance between two points."""
-        return np.sqrt((point1[0] - point2[0])**2 + (point1[1] - point2[1])**2)
+        return math.hypot(point1[0] - point2[0], point1[1] - point2[1])
     
     def assign_delivery_locations(self, products: List[Dict]) -> List[Dict]:
         """Assign realistic delivery locations to products."""
-        # Generate realistic delivery locations around the warehouse
+        # Generate realistic delivery locations around the warehouse (all random draws in bulk)
         warehouse_location = (0, 0)
-        delivery_locations = []
+        n = len(products)
+        rng = self._rng
+        angles = rng.uniform(0, 2 * np.pi, n)
+        distances = rng.uniform(5, 50, n)  # 5-50 miles from warehouse
+        xs = (warehouse_location[0] + distances * np.cos(angles)).tolist()
+        ys = (warehouse_location[1] + distances * np.sin(angles)).tolist()
+        day_offsets = rng.integers(1, 8, n).tolist()  # 1-7 days out
+        window_hours = rng.integers(8, 13, n).tolist()  # Window opens 8am-12pm
+        service_times = rng.uniform(0.25, 1.0, n).tolist()  # 15-60 minutes
+        priority_scores = self._calculate_priority_scores(products).tolist()
+        now = datetime.now()
         
-        for i, product in enumerate(products):
-            # Generate random delivery location within reasonable range
-            angle = random.uniform(0, 2 * np.pi)
-            distance = random.uniform(5, 50)  # 5-50 miles from warehouse
-            x = warehouse_location[0] + distance * np.cos(angle)
-            y = warehouse_location[1] + distance * np.sin(angle)
-            
-            # Add delivery time window
-            base_time = datetime.now() + timedelta(days=random.randint(1, 7))
-            delivery_window_start = base_time.replace(hour=random.randint(8, 12), minute=0)
-            delivery_window_end = delivery_window_start + timedelta(hours=2)
-            
-            product_with_location = product.copy()
-            product_with_location.update({
-                'delivery_location': (x, y),
-                'delivery_window_start': delivery_window_start,
-                'delivery_window_end': delivery_window_end,
-                'service_time': random.uniform(0.25, 1.0),  # 15-60 minutes
-                'priority_score': self._calculate_priority_score(product)
-            })
-            delivery_locations.append(product_with_location)
+        # Add delivery time windows
+        window_starts = [(now + timedelta(days=days)).replace(hour=hour, minute=0)
+                         for days, hour in zip(day_offsets, window_hours)]
+        window_length = timedelta(hours=2)
         
-        return delivery_locations
+        # Build each planning record in one dict literal; the caller's products are left untouched
+        return [
+            {
+                **product,
+                'delivery_location': (x, y),
+                'delivery_window_start': window_start,
+                'delivery_window_end': window_start + window_length,
+                'service_time': service_time,
+                'priority_score': priority_score
+            }
+            for product, x, y, window_start, service_time, priority_score
+            in zip(products, xs, ys, window_starts, service_times, priority_scores)
+        ]
     
-    def _calculate_priority_score(self, product: Dict) -> float:
-        """Calculate priority score based on product attributes."""
-        score = 0
+    def _calculate_priority_scores(self, products: List[Dict]) -> np.ndarray:
+        """Calculate priority scores based on product attributes, for all products at once."""
+        n = len(products)
         
         # Priority level
-        priority_map = {'High': 3, 'Medium': 2, 'Low': 1}
-        score += priority_map.get(product.get('Priority', 'Medium'), 2)
+        scores = np.fromiter((PRIORITY_SCORES.get(p.get('Priority', 'Medium'), 2) for p in products),
+                             dtype=np.float64, count=n)
         
         # Fragile items get higher priority
-        if product.get('Fragile', False):
-            score += 1
+        scores += np.fromiter((bool(p.get('Fragile', False)) for p in products), dtype=bool, count=n)
         
         # Weight-based priority (heavier items might need special handling)
-        if product.get('Weight', 0) > 200:
-            score += 0.5
+        scores += 0.5 * (np.fromiter((p.get('Weight', 0) for p in products), dtype=np.float64, count=n) > 200)
         
-        return score
+        return scores
     
     def set_vehicles(self, vehicles):
         self.vehicles = vehicles
+        self._vehicle_index = {v['id']: i for i, v in enumerate(vehicles)}
     def set_drivers(self, drivers):
         self.drivers = drivers
+        self._driver_index = {d['id']: i for i, d in enumerate(drivers)}
+    
+    def get_vehicle(self, vehicle_id: str) -> Dict:
+        """Look up a vehicle by ID (None if unknown)."""
+        i = self._vehicle_index.get(vehicle_id)
+        return self.vehicles[i] if i is not None else None
+    
+    def get_driver(self, driver_id: str) -> Dict:
+        """Look up a driver by ID (None if unknown)."""
+        i = self._driver_index.get(driver_id)
+        return self.drivers[i] if i is not None else None
     
     def optimize_routes(self, products_with_locations: List[Dict], constraints: Dict) -> List[Dict]:
         """
@@ -107,6 +265,11 @@ class DispatchPlanner:
         if not self.drivers:
             raise Exception("No drivers available. Please add drivers in the system settings.")
         
+        # Availability can change between runs, so collect available drivers once per run
+        available_drivers = [d for d in self.drivers if d['available']]
+        if not available_drivers:
+            raise Exception("No drivers are currently available. Please mark a driver as available in the system settings.")
+        
         # Group products by delivery date
         products_by_date = self._group_by_delivery_date(products_with_locations)
         
@@ -114,21 +277,41 @@ class DispatchPlanner:
         
         for delivery_date, products in products_by_date.items():
             # Sort products by priority and delivery window
-            sorted_products = sorted(products, 
-                                   key=lambda x: (x['priority_score'], x['delivery_window_start']),
-                                   reverse=True)
+            sorted_products = self._sort_by_priority(products)
+            
+            # Volumes are computed once per group and shared by assignment and route totals
+            product_volumes = np.fromiter((_product_volume(p) for p in sorted_products), dtype=np.float64,
+                                          count=len(sorted_products))
             
             # Assign products to vehicles
-            vehicle_assignments = self._assign_products_to_vehicles(sorted_products, constraints)
+            vehicle_assignments = self._assign_products_to_vehicles(sorted_products, constraints, product_volumes)
+            
+            # Build nearest-neighbor orders for all loaded vehicles in one batched pass
+            loaded = [(vehicle_id, [sorted_products[i] for i in indices], product_volumes[indices])
+                      for vehicle_id, indices in vehicle_assignments.items() if indices]
+            stop_orders = _nearest_neighbor_orders([
+                np.asarray([p['delivery_location'] for p in vehicle_products], dtype=np.float64)
+                for _, vehicle_products, _ in loaded
+            ])
             
             # Optimize routes for each vehicle
-            for vehicle_id, vehicle_products in vehicle_assignments.items():
-                if vehicle_products:
-                    route = self._optimize_single_route(vehicle_id, vehicle_products, constraints)
-                    optimized_routes.append(route)
+            for (vehicle_id, vehicle_products, volumes), (order, legs) in zip(loaded, stop_orders):
+                route = self._optimize_single_route(vehicle_id, vehicle_products, constraints, order, legs,
+                                                    available_drivers, volumes)
+                optimized_routes.append(route)
         
         return optimized_routes
     
+    @staticmethod
+    def _sort_by_priority(products: List[Dict]) -> List[Dict]:
+        """Order products by priority score, then delivery window start, both descending."""
+        n = len(products)
+        scores = np.fromiter((p['priority_score'] for p in products), dtype=np.float64, count=n)
+        starts = np.array([p['delivery_window_start'] for p in products], dtype='datetime64[us]').astype(np.int64)
+        # lexsort is stable, so ties keep their input order just like sorted(..., reverse=True)
+        order = np.lexsort((-starts, -scores))
+        return [products[i] for i in order]
+    
     def _group_by_delivery_date(self, products: List[Dict]) -> Dict:
         """Group products by delivery date."""
         grouped = {}
@@ -139,92 +322,107 @@ class DispatchPlanner:
             grouped[date_key].append(product)
         return grouped
     
+    def _fleet_arrays(self) -> Dict[str, np.ndarray]:
+        """Snapshot the fleet as parallel NumPy arrays (one per field) for vectorized planning."""
+        n = len(self.vehicles)
+        return {
+            'capacity_weight': np.fromiter((v['capacity_weight'] for v in self.vehicles), dtype=np.float64, count=n),
+            'capacity_volume': np.fromiter((v['capacity_volume'] for v in self.vehicles), dtype=np.float64, count=n),
+            'available': np.fromiter((bool(v['available']) for v in self.vehicles), dtype=bool, count=n)
+        }
+    
     def _assign_products_to_vehicles(self, products: List[Dict], 
-                                   constraints: Dict) -> Dict:
-        """Assign products to vehicles based on capacity and constraints."""
-        vehicle_assignments = {vehicle['id']: [] for vehicle in self.vehicles}
-        vehicle_capacities = {vehicle['id']: {'weight': 0, 'volume': 0} for vehicle in self.vehicles}
+                                   constraints: Dict, product_volumes: np.ndarray = None) -> Dict:
+        """
+        Assign products to vehicles based on capacity and constraints.
+        Args:
+            products (list of dict): Products to load, in loading order.
+            constraints (dict): Optimization constraints.
+            product_volumes (np.ndarray, optional): Volume of each product; computed when omitted.
+        Returns:
+            dict: Vehicle id to the positions in products of the products it carries.
+        """
+        vehicle_ids = [vehicle['id'] for vehicle in self.vehicles]
+        vehicle_assignments = {vehicle_id: [] for vehicle_id in vehicle_ids}
+        fleet = self._fleet_arrays()
+        # Unavailable vehicles get no remaining capacity, so the fit mask alone excludes them
+        remaining_weight = np.where(fleet['available'], fleet['capacity_weight'], -np.inf)
+        remaining_volume = np.where(fleet['available'], fleet['capacity_volume'], -np.inf)
+        # Vehicle with most capacity takes anything that fits nowhere else
+        overflow_vehicle = vehicle_ids[int(fleet['capacity_weight'].argmax())]
         
-        for product in products:
-            assigned = False
-            
-            # Try to assign to available vehicle
-            for vehicle in self.vehicles:
-                if not vehicle['available']:
-                    continue
-                
-                current_weight = vehicle_capacities[vehicle['id']]['weight']
-                current_volume = vehicle_capacities[vehicle['id']]['volume']
-                
-                # Check if product fits
-                if (current_weight + product['Weight'] <= vehicle['capacity_weight'] and
-                    current_volume + product['Length'] * product['Width'] * product['Height'] <= vehicle['capacity_volume']):
-                    
-                    vehicle_assignments[vehicle['id']].append(product)
-                    vehicle_capacities[vehicle['id']]['weight'] += product['Weight']
-                    vehicle_capacities[vehicle['id']]['volume'] += product['Length'] * product['Width'] * product['Height']
-                    assigned = True
-                    break
+        product_weights = np.fromiter((p['Weight'] for p in products), dtype=np.float64, count=len(products))
+        if product_volumes is None:
+            product_volumes = np.fromiter((_product_volume(p) for p in products), dtype=np.float64, count=len(products))
+        
+        for i in range(len(products)):
+            # First vehicle the product fits in
+            fits = (remaining_weight >= product_weights[i]) & (remaining_volume >= product_volumes[i])
+            j = int(fits.argmax())
             
-            # If no vehicle available, create new route
-            if not assigned:
-                # Find vehicle with most capacity
-                best_vehicle = max(self.vehicles, key=lambda v: v['capacity_weight'])
-                vehicle_assignments[best_vehicle['id']].append(product)
+            if fits[j]:
+                vehicle_assignments[vehicle_ids[j]].append(i)
+                remaining_weight[j] -= product_weights[i]
+                remaining_volume[j] -= product_volumes[i]
+            else:
+                # If no vehicle available, create new route
+                vehicle_assignments[overflow_vehicle].append(i)
         
         return vehicle_assignments
     
     def _optimize_single_route(self, vehicle_id: str, products: List[Dict], 
-                             constraints: Dict) -> Dict:
-        """Optimize route for a single vehicle using nearest neighbor algorithm."""
+                             constraints: Dict, order: np.ndarray = None, legs: np.ndarray = None,
+                             available_drivers: List[Dict] = None, volumes: np.ndarray = None) -> Dict:
+        """Optimize route for a single vehicle using nearest neighbor construction and 2-opt improvement."""
         if not products:
             return {}
+        if volumes is None:
+            volumes = np.fromiter((_product_volume(p) for p in products), dtype=np.float64, count=len(products))
         
-        # Start from warehouse
-        current_location = (0, 0)
-        unvisited = products.copy()
+        coords = np.asarray([p['delivery_location'] for p in products], dtype=np.float64)
+        if order is None:
+            order, legs = _nearest_neighbor_orders([coords])[0]
+        # Shorten the nearest-neighbor tour with 2-opt (routes over TWO_OPT_MAX_STOPS keep it as built)
+        order, legs = _two_opt(order, coords)
         route = []
         total_distance = 0
-        total_cost = 0
+        total_weight = 0
+        total_volume = float(volumes.sum())
         
         # Find vehicle and driver
-        vehicle = next(v for v in self.vehicles if v['id'] == vehicle_id)
-        driver = random.choice([d for d in self.drivers if d['available']])
+        vehicle = self.get_vehicle(vehicle_id)
+        if available_drivers is None:
+            available_drivers = [d for d in self.drivers if d['available']]
+        driver = available_drivers[int(self._rng.integers(len(available_drivers)))]
         
-        # Build route using nearest neighbor
-        while unvisited:
-            # Find nearest unvisited location
-            nearest = min(unvisited, 
-                         key=lambda p: self.calculate_distance(current_location, p['delivery_location']))
+        # Build route in the tour order chosen above, starting from the warehouse now
+        start_time = datetime.now()
+        for k, leg in zip(order, legs):
+            nearest = products[k]
             
-            # Calculate distance to this location
-            distance = self.calculate_distance(current_location, nearest['delivery_location'])
+            # Distance to this location
+            distance = float(leg)
             total_distance += distance
+            total_weight += nearest['Weight']
             
             # Add to route
             route.append({
                 'product': nearest,
                 'location': nearest['delivery_location'],
                 'distance_from_previous': distance,
-                'estimated_arrival': self._calculate_arrival_time(nearest, total_distance),
+                'estimated_arrival': start_time + timedelta(hours=total_distance / AVERAGE_SPEED_MPH),
                 'service_time': nearest['service_time']
             })
-            
-            # Update current location
-            current_location = nearest['delivery_location']
-            unvisited.remove(nearest)
         
         # Calculate return trip to warehouse
-        return_distance = self.calculate_distance(current_location, (0, 0))
+        return_distance = self.calculate_distance(products[order[-1]]['delivery_location'], (0, 0))
         total_distance += return_distance
         
         # Calculate costs
         # Assume total_distance is in miles, convert to km
-        total_distance_km = total_distance * 1.60934
-        fuel_cost = (total_distance_km / vehicle['fuel_efficiency']) * FUEL_PRICE_PER_LITER
-        operating_cost = total_distance_km * vehicle['operating_cost_per_km']
-        driver_cost = (total_distance_km / 30) * driver['hourly_rate']  # Assume 30 mph average
-        total_cost = fuel_cost + operating_cost + driver_cost
+        total_distance_km = total_distance * MILES_TO_KM
+        fuel_cost, operating_cost, driver_cost, total_cost = compute_costs(
+            total_distance_km, vehicle['fuel_efficiency'], vehicle['operating_cost_per_km'], driver['hourly_rate'])
         
         return {
             'vehicle_id': vehicle_id,
@@ -236,37 +434,31 @@ class DispatchPlanner:
             'fuel_cost': round(fuel_cost, 2),
             'operating_cost': round(operating_cost, 2),
             'driver_cost': round(driver_cost, 2),
-            'estimated_duration': round(total_distance / 30, 2),  # hours
+            'estimated_duration': round(total_distance / AVERAGE_SPEED_MPH, 2),  # hours
             'products_delivered': len(products),
-            'total_weight': sum(p['Weight'] for p in products),
-            'total_volume': sum(p['Length'] * p['Width'] * p['Height'] for p in products),
+            'total_weight': total_weight,
+            'total_volume': total_volume,
             'total_distance_km': round(total_distance_km, 2),
             'average_cost_per_km': round(total_cost / total_distance_km, 2) if total_distance_km > 0 else 0,
             'average_cost_per_product': round(total_cost / len(products), 2) if len(products) > 0 else 0
         }
     
-    def _calculate_arrival_time(self, product: Dict, total_distance: float) -> datetime:
-        """Calculate estimated arrival time based on distance and current time."""
-        # Assume average speed of 30 mph
-        travel_time_hours = total_distance / 30
-        travel_time = timedelta(hours=travel_time_hours)
-        
-        # Start from current time
-        start_time = datetime.now()
-        arrival_time = start_time + travel_time
-        
-        return arrival_time
-    
     def get_route_summary(self, routes: List[Dict]) -> Dict:
         """Generate summary statistics for all routes."""
         if not routes:
             return {}
         
-        total_distance_km = sum(route['total_distance'] for route in routes) * 1.60934
-        total_cost = sum(route['total_cost'] for route in routes)
-        total_products = sum(route['products_delivered'] for route in routes)
-        total_weight = sum(route['total_weight'] for route in routes)
-        total_volume = sum(route['total_volume'] for route in routes)
+        # Reduce all per-route totals in a single vectorized pass
+        totals = np.array([
+            (route['total_distance_km'], route['total_cost'], route['products_delivered'],
+             route['total_weight'], route['total_volume'])
+            for route in routes
+        ], dtype=np.float64).sum(axis=0)
+        total_distance_km = float(totals[0])  # Already converted to km per route
+        total_cost = float(totals[1])
+        total_products = int(totals[2])
+        total_weight = float(totals[3])
+        total_volume = float(totals[4])
         
         return {
             'total_routes': len(routes),
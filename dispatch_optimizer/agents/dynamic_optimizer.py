@@ -10,28 +10,101 @@ from typing import List, Dict, Callable
 import queue
 import json
 import sqlite3
+import numpy as np
 from dispatch_optimizer.agents.optimizer import optimize_dispatch
 from dispatch_optimizer.agents.dispatch_planner import DispatchPlanner
 
+CHECK_INTERVAL_SECONDS = 30  # How often the loop checks whether to re-optimize and logs metrics
+STATUS_AVAILABLE, STATUS_DISPATCHED = 0, 1  # Codes stored in the status array
+WARM_START_GENERATIONS = 10  # GA generations when seeded from the previous storage order
+LOG_BATCH_SIZE = 50  # Most log rows the writer thread commits in one transaction
+LOG_WRITER_IDLE_SECONDS = 5  # The writer thread exits after this long without log rows
+
+MOVEMENT_INSERT_SQL = '''
+    INSERT INTO goods_movement 
+    (movement_type, product_id, product_name, quantity, location_from, location_to, weight, volume, priority, status)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+'''
+
+OPTIMIZATION_INSERT_SQL = '''
+    INSERT INTO optimization_history 
+    (optimization_type, products_count, routes_count, total_cost, total_distance, optimization_duration, status)
+    VALUES (?, ?, ?, ?, ?, ?, ?)
+'''
+
+METRICS_INSERT_SQL = '''
+    INSERT INTO real_time_metrics 
+    (total_products, total_weight, total_volume, active_routes, available_vehicles, utilization_rate)
+    VALUES (?, ?, ?, ?, ?, ?)
+'''
+
 class DynamicOptimizer:
     def __init__(self, db_path="dynamic_optimization.db"):
         self.db_path = db_path
-        self.event_queue = queue.Queue()
+        self.event_queue = queue.SimpleQueue()
+        self._wake = threading.Event()  # Set when events arrive or the loop should stop
         self.optimization_thread = None
+        self.background_thread = None  # One-off optimization started by optimize_in_background
+        self._state_lock = threading.Lock()  # Serialises event handling and optimization across threads
         self.is_running = False
         self.current_state = {}
+        self._init_state_arrays()
         self.optimization_callbacks = []
         self.dispatch_planner = DispatchPlanner()
         self.last_optimization = None
         self.optimization_interval = 300  # 5 minutes default
+        self._last_metrics = None  # Last metrics row written, to skip logging unchanged ticks
+        self._last_storage_order = None  # Product IDs in the last storage plan's order, for GA warm starts
+        
+        # Log rows are queued as (sql, params) and written by a single writer thread
+        self._write_queue = queue.Queue()
+        self._writer_lock = threading.Lock()
+        self._writer_thread = None
         
         # Initialize database
         self._init_database()
+    
+    def _init_state_arrays(self, capacity: int = 64):
+        """Allocate the structure-of-arrays mirror of current_state used for vectorized metrics."""
+        self._state_index = {}  # product_id -> row in the arrays below
+        self._product_ids = np.empty(capacity, dtype=object)
+        self._weights = np.zeros(capacity)
+        self._volumes = np.zeros(capacity)  # Length * Width * Height, computed once on ingress
+        self._status = np.zeros(capacity, dtype=np.uint8)
+        self._assigned = np.zeros(capacity, dtype=bool)
+    
+    def _state_row(self, product_id: str) -> int:
+        """Return the array row for a product, appending one (doubling capacity when full) if it is new."""
+        row = self._state_index.get(product_id)
+        if row is not None:
+            return row
+        row = len(self._state_index)
+        if row == len(self._status):
+            capacity = 2 * row
+            for name in ('_product_ids', '_weights', '_volumes', '_status', '_assigned'):
+                old = getattr(self, name)
+                grown = np.zeros(capacity, dtype=old.dtype) if old.dtype != object else np.empty(capacity, dtype=object)
+                grown[:row] = old
+                setattr(self, name, grown)
+        self._state_index[product_id] = row
+        self._product_ids[row] = product_id
+        return row
+    
+    def _available_mask(self) -> np.ndarray:
+        """Boolean mask over the used rows marking products that are still available."""
+        return self._status[:len(self._state_index)] == STATUS_AVAILABLE
         
     def _init_database(self):
-        """Initialize database for tracking dynamic changes."""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
+        """Open the persistent log connection and initialize tables for tracking dynamic changes."""
+        # One connection for the optimizer's lifetime, used only by the log writer thread after setup;
+        # autocommit mode so each batch controls its own transaction
+        self._conn = sqlite3.connect(self.db_path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("PRAGMA busy_timeout=5000")
+        self._conn.execute("PRAGMA temp_store=MEMORY")
+        self._conn.execute("PRAGMA cache_size=-20000")  # ~20 MB page cache
+        cursor = self._conn.cursor()
         
         cursor.execute('''
             CREATE TABLE IF NOT EXISTS goods_movement (
@@ -77,8 +150,10 @@ class DynamicOptimizer:
             )
         ''')
         
-        conn.commit()
-        conn.close()
+        # Dashboard reads filter by time; index it so they don't scan the ever-growing logs
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_gm_ts ON goods_movement(timestamp)')
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_oh_ts ON optimization_history(timestamp)')
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_rtm_ts ON real_time_metrics(timestamp)')
     
     def start_dynamic_optimization(self):
         """Start the dynamic optimization thread."""
@@ -94,39 +169,63 @@ class DynamicOptimizer:
     def stop_dynamic_optimization(self):
         """Stop the dynamic optimization thread."""
         self.is_running = False
+        self._wake.set()
         if self.optimization_thread:
             self.optimization_thread.join()
+        self._flush_logs()
         print("⏹️ Dynamic optimization stopped")
     
     def _optimization_loop(self):
-        """Main optimization loop that runs continuously."""
+        """Main optimization loop; handles events as they arrive and checks for re-optimization periodically."""
+        next_check = time.monotonic()
         while self.is_running:
             try:
-                # Process any pending events
-                self._process_events()
-                
-                # Check if optimization is needed
-                if self._should_optimize():
-                    self._perform_optimization()
+                # Clear before draining so an event added meanwhile wakes the next wait
+                self._wake.clear()
                 
-                # Update real-time metrics
-                self._update_metrics()
+                with self._state_lock:
+                    # Process any pending events
+                    self._process_events()
+                    
+                    if time.monotonic() >= next_check:
+                        # Check if optimization is needed
+                        if self._should_optimize():
+                            self._perform_optimization()
+                        
+                        # Update real-time metrics
+                        self._update_metrics()
+                        next_check = time.monotonic() + CHECK_INTERVAL_SECONDS
                 
-                # Sleep for a short interval
-                time.sleep(30)  # Check every 30 seconds
+                # Sleep until the next check unless an event or stop request arrives first
+                self._wake.wait(timeout=max(0, next_check - time.monotonic()))
                 
             except Exception as e:
                 print(f"Error in optimization loop: {e}")
                 time.sleep(60)  # Wait longer on error
     
+    def optimize_in_background(self) -> threading.Thread:
+        """
+        Process pending events and run one full optimization on a worker thread.
+        Returns:
+            threading.Thread: The started worker; is_alive() is False once the results are in current_state.
+        """
+        def run():
+            with self._state_lock:
+                self._process_events()
+                self._perform_optimization()
+        
+        self.background_thread = threading.Thread(target=run, daemon=True)
+        self.background_thread.start()
+        return self.background_thread
+    
     def _process_events(self):
         """Process pending events in the queue."""
-        while not self.event_queue.empty():
+        while True:
             try:
                 event = self.event_queue.get_nowait()
-                self._handle_event(event)
             except queue.Empty:
                 break
+            self._handle_event(event)
     
     def _handle_event(self, event: Dict):
         """Handle a single event."""
@@ -161,6 +260,11 @@ class DynamicOptimizer:
             'timestamp': datetime.now(),
             'status': 'available'
         }
+        row = self._state_row(product_id)
+        self._weights[row] = product.get('Weight', 0)
+        self._volumes[row] = product.get('Length', 0) * product.get('Width', 0) * product.get('Height', 0)
+        self._status[row] = STATUS_AVAILABLE
+        self._assigned[row] = False
         
         print(f"📦 Goods in: {product.get('Product', 'Unknown')} at {location}")
     
@@ -172,6 +276,7 @@ class DynamicOptimizer:
         if product_id in self.current_state:
             # Mark as dispatched
             self.current_state[product_id]['status'] = 'dispatched'
+            self._status[self._state_index[product_id]] = STATUS_DISPATCHED
             self.current_state[product_id]['destination'] = destination
             self.current_state[product_id]['dispatch_time'] = datetime.now()
             
@@ -206,11 +311,10 @@ class DynamicOptimizer:
         status = event.get('status')
         
         # Update vehicle status in dispatch planner
-        for vehicle in self.dispatch_planner.vehicles:
-            if vehicle['id'] == vehicle_id:
-                vehicle['available'] = (status == 'available')
-                vehicle['last_status_update'] = datetime.now()
-                break
+        vehicle = self.dispatch_planner.get_vehicle(vehicle_id)
+        if vehicle is not None:
+            vehicle['available'] = (status == 'available')
+            vehicle['last_status_update'] = datetime.now()
         
         print(f"🚛 Vehicle status: {vehicle_id} is {status}")
     
@@ -221,12 +325,11 @@ class DynamicOptimizer:
         hours_worked = event.get('hours_worked', 0)
         
         # Update driver status in dispatch planner
-        for driver in self.dispatch_planner.drivers:
-            if driver['id'] == driver_id:
-                driver['available'] = (status == 'available')
-                driver['current_hours'] = hours_worked
-                driver['last_status_update'] = datetime.now()
-                break
+        driver = self.dispatch_planner.get_driver(driver_id)
+        if driver is not None:
+            driver['available'] = (status == 'available')
+            driver['current_hours'] = hours_worked
+            driver['last_status_update'] = datetime.now()
         
         print(f"👤 Driver status: {driver_id} is {status} ({hours_worked} hours)")
     
@@ -241,8 +344,7 @@ class DynamicOptimizer:
             return False
         
         # Check if there are significant changes
-        available_products = [p for p in self.current_state.values() if p['status'] == 'available']
-        if len(available_products) < 5:
+        if int(self._available_mask().sum()) < 5:
             return False
         
         return True
@@ -252,9 +354,10 @@ class DynamicOptimizer:
         start_time = datetime.now()
         
         try:
-            # Get available products
-            available_products = [p['product'] for p in self.current_state.values() 
-                                if p['status'] == 'available']
+            # Get available products (array rows follow current_state's insertion order)
+            available = self._available_mask()
+            available_ids = self._product_ids[:len(self._state_index)][available]
+            available_products = [self.current_state[product_id]['product'] for product_id in available_ids]
             
             if not available_products:
                 return
@@ -269,8 +372,17 @@ class DynamicOptimizer:
                 'storage_height': 15
             }
             
-            # Perform storage optimization
-            storage_plan = optimize_dispatch(available_products, constraints)
+            # Perform storage optimization, warm-started from the previous plan when there is one
+            warm_start = None
+            if self._last_storage_order:
+                position = {product_id: i for i, product_id in enumerate(available_ids)}
+                previous = [position[product_id] for product_id in self._last_storage_order if product_id in position]
+                warm_start = [previous] if previous else None
+            storage_plan = optimize_dispatch(available_products, constraints,
+                                             volumes=self._volumes[:len(self._state_index)][available],
+                                             warm_start=warm_start,
+                                             ngen=WARM_START_GENERATIONS if warm_start else 40)
+            self._last_storage_order = [p.get('Product') for p in storage_plan]
             
             # Perform dispatch planning
             products_with_locations = self.dispatch_planner.assign_delivery_locations(available_products)
@@ -332,28 +444,33 @@ class DynamicOptimizer:
                 product_id = product.get('Product', 'unknown')
                 if product_id in self.current_state:
                     self.current_state[product_id]['assigned_vehicle'] = route.get('vehicle_id')
+                    self._assigned[self._state_index[product_id]] = bool(route.get('vehicle_id'))
                     self.current_state[product_id]['assigned_driver'] = route.get('driver_name')
                     self.current_state[product_id]['estimated_arrival'] = route_item.get('estimated_arrival')
     
     def _update_metrics(self):
         """Update real-time metrics."""
-        available_products = [p for p in self.current_state.values() if p['status'] == 'available']
-        total_weight = sum(p['product'].get('Weight', 0) for p in available_products)
-        total_volume = sum(p['product'].get('Length', 0) * p['product'].get('Width', 0) * p['product'].get('Height', 0) 
-                          for p in available_products)
+        n = len(self._state_index)
+        available = self._available_mask()
+        available_count = int(available.sum())
+        total_weight = float(self._weights[:n][available].sum())
+        total_volume = float(self._volumes[:n][available].sum())
         
         available_vehicles = sum(1 for v in self.dispatch_planner.vehicles if v['available'])
         
         metrics = {
-            'total_products': len(available_products),
+            'total_products': available_count,
             'total_weight': total_weight,
             'total_volume': total_volume,
-            'active_routes': len([p for p in self.current_state.values() if p.get('assigned_vehicle')]),
+            'active_routes': int(self._assigned[:n].sum()),
             'available_vehicles': available_vehicles,
-            'utilization_rate': len(available_products) / max(len(self.current_state), 1)
+            'utilization_rate': available_count / max(n, 1)
         }
         
-        self._log_metrics(metrics)
+        # An idle system produces identical metrics every tick; only log when something changed
+        if metrics != self._last_metrics:
+            self._log_metrics(metrics)
+            self._last_metrics = metrics
     
     def add_optimization_callback(self, callback: Callable):
         """Add a callback function to be called when optimization completes."""
@@ -368,8 +485,16 @@ class DynamicOptimizer:
                 print(f"Error in optimization callback: {e}")
     
     def add_event(self, event: Dict):
-        """Add an event to the processing queue."""
+        """Add an event to the processing queue and wake the optimization loop."""
         self.event_queue.put(event)
+        self._wake.set()
+    
+    def add_events(self, events: List[Dict]):
+        """Add several events to the processing queue, waking the optimization loop once."""
+        put = self.event_queue.put
+        for event in events:
+            put(event)
+        self._wake.set()
     
     def get_current_state(self) -> Dict:
         """Get the current state of all goods."""
@@ -379,57 +504,123 @@ class DynamicOptimizer:
         """Get the current optimization status."""
         return {
             'is_running': self.is_running,
+            'background_optimization': bool(self.background_thread and self.background_thread.is_alive()),
             'last_optimization': self.last_optimization,
             'optimization_interval': self.optimization_interval,
             'pending_events': self.event_queue.qsize(),
             'total_products': len(self.current_state),
-            'available_products': len([p for p in self.current_state.values() if p['status'] == 'available'])
+            'available_products': int(self._available_mask().sum())
         }
     
     def reset_state(self):
         """Reset the dynamic optimizer's state (clear all products and events)."""
-        self.current_state.clear()
-        while not self.event_queue.empty():
+        with self._state_lock:
+            self.current_state.clear()
+            self._init_state_arrays()
+            self._last_storage_order = None
+            while True:
+                try:
+                    self.event_queue.get_nowait()
+                except queue.Empty:
+                    break
+    
+    def _buffer_log(self, sql: str, row: tuple):
+        """Hand a log row to the writer thread, starting it if it is not running."""
+        with self._writer_lock:
+            self._write_queue.put((sql, row))
+            if self._writer_thread is None:
+                self._writer_thread = threading.Thread(target=self._log_writer_loop, daemon=True)
+                self._writer_thread.start()
+    
+    def _log_writer_loop(self):
+        """Single writer: commit queued log rows in batches, exiting once the queue stays idle."""
+        try:
+            while True:
+                try:
+                    batch = [self._write_queue.get(timeout=LOG_WRITER_IDLE_SECONDS)]
+                except queue.Empty:
+                    with self._writer_lock:
+                        if self._write_queue.empty():
+                            self._writer_thread = None
+                            return
+                    continue
+                try:
+                    # Take whatever else is already queued, up to one batch
+                    while len(batch) < LOG_BATCH_SIZE:
+                        try:
+                            batch.append(self._write_queue.get_nowait())
+                        except queue.Empty:
+                            break
+                    self._write_batch(batch)
+                finally:
+                    for _ in batch:
+                        self._write_queue.task_done()
+        finally:
+            # However the loop ends, let the next log row start a fresh writer
+            with self._writer_lock:
+                if self._writer_thread is threading.current_thread():
+                    self._writer_thread = None
+    
+    def _write_batch(self, batch: List[tuple]):
+        """Write (sql, params) log rows in a single transaction, falling back to row by row if it fails."""
+        rows_by_sql = {}
+        for sql, row in batch:
+            rows_by_sql.setdefault(sql, []).append(row)
+        try:
+            self._conn.execute("BEGIN IMMEDIATE")
+            for sql, rows in rows_by_sql.items():
+                self._conn.executemany(sql, rows)
+            self._conn.execute("COMMIT")
+            return
+        except Exception as e:
+            self._rollback()
+            print(f"Error writing optimization logs, retrying row by row: {e}")
+        
+        # Autocommit each row so only the bad ones are lost
+        for sql, row in batch:
             try:
-                self.event_queue.get_nowait()
-            except Exception:
-                break
+                self._conn.execute(sql, row)
+            except Exception as e:
+                self._rollback()
+                print(f"Dropping optimization log row {row!r}: {e}")
+    
+    def _rollback(self):
+        """Roll back the writer connection's open transaction, if any, so it releases its lock."""
+        try:
+            if self._conn.in_transaction:
+                self._conn.execute("ROLLBACK")
+        except sqlite3.Error as e:
+            print(f"Error rolling back optimization logs: {e}")
+    
+    def _flush_logs(self):
+        """Block until every queued log row has been written."""
+        self._write_queue.join()
     
     def _log_movement_event(self, event: Dict):
         """Log a movement event to the database."""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
-        cursor.execute('''
-            INSERT INTO goods_movement 
-            (movement_type, product_id, product_name, quantity, location_from, location_to, weight, volume, priority, status)
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-        ''', (
+        product = event.get('product', {})
+        # Goods coming in already had their volume computed by _handle_goods_in
+        row = self._state_index.get(product.get('Product')) if event.get('type') == 'goods_in' else None
+        if row is not None:
+            volume = float(self._volumes[row])
+        else:
+            volume = product.get('Length', 0) * product.get('Width', 0) * product.get('Height', 0)
+        self._buffer_log(MOVEMENT_INSERT_SQL, (
             event.get('type'),
-            event.get('product_id', event.get('product', {}).get('Product', 'unknown')),
-            event.get('product', {}).get('Product', 'unknown'),
+            event.get('product_id', product.get('Product', 'unknown')),
+            product.get('Product', 'unknown'),
             event.get('quantity', 1),
             event.get('location_from', ''),
             event.get('location_to', event.get('location', '')),
-            event.get('product', {}).get('Weight', 0),
-            event.get('product', {}).get('Length', 0) * event.get('product', {}).get('Width', 0) * event.get('product', {}).get('Height', 0),
-            event.get('product', {}).get('Priority', 'Medium'),
+            product.get('Weight', 0),
+            volume,
+            product.get('Priority', 'Medium'),
             event.get('status', 'completed')
         ))
-        
-        conn.commit()
-        conn.close()
     
     def _log_optimization(self, optimization_data: Dict):
         """Log optimization results to the database."""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
-        cursor.execute('''
-            INSERT INTO optimization_history 
-            (optimization_type, products_count, routes_count, total_cost, total_distance, optimization_duration, status)
-            VALUES (?, ?, ?, ?, ?, ?, ?)
-        ''', (
+        self._buffer_log(OPTIMIZATION_INSERT_SQL, (
             optimization_data.get('type'),
             optimization_data.get('products_count'),
             optimization_data.get('routes_count'),
@@ -438,27 +629,14 @@ class DynamicOptimizer:
             optimization_data.get('duration'),
             optimization_data.get('status')
         ))
-        
-        conn.commit()
-        conn.close()
     
     def _log_metrics(self, metrics: Dict):
         """Log real-time metrics to the database."""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
-        cursor.execute('''
-            INSERT INTO real_time_metrics 
-            (total_products, total_weight, total_volume, active_routes, available_vehicles, utilization_rate)
-            VALUES (?, ?, ?, ?, ?, ?)
-        ''', (
+        self._buffer_log(METRICS_INSERT_SQL, (
             metrics.get('total_products'),
             metrics.get('total_weight'),
             metrics.get('total_volume'),
             metrics.get('active_routes'),
             metrics.get('available_vehicles'),
             metrics.get('utilization_rate')
-        ))
-        
-        conn.commit()
-        conn.close() 
\ No newline at end of file
+        ))
\ No newline at end of file
@@ -5,81 +5,141 @@ Core optimization logic for warehouse storage and inventory optimization using D
 
 from deap import base, creator, tools, algorithms
 import random
+from bisect import bisect_right
 import numpy as np
 
-def optimize_dispatch(products, constraints):
+# DEAP types live on the creator module; register them once per process instead of on every call
+if not hasattr(creator, "FitnessMin"):
+    creator.create("FitnessMin", base.Fitness, weights=(-1.0,))
+if not hasattr(creator, "Individual"):
+    creator.create("Individual", list, fitness=creator.FitnessMin)
+
+def _area_breaks(order, weights, volumes, max_weight, max_volume):
+    """
+    Positions in a filling order at which a new storage area is opened.
+    Prefix sums of weight and volume are taken in NumPy and each boundary is found by
+    bisecting them, so the Python-level work is per storage area rather than per product.
+    """
+    n = len(order)
+    if n == 0:
+        return []
+    idx = np.asarray(order, dtype=np.intp)
+    cum_weight = np.cumsum(weights[idx]).tolist()
+    cum_volume = np.cumsum(volumes[idx]).tolist()
+    
+    breaks = []
+    # Position of the first product that overflows the current area
+    end = min(bisect_right(cum_weight, max_weight), bisect_right(cum_volume, max_volume))
+    while end < n:
+        breaks.append(end)
+        base_weight = cum_weight[end - 1] if end else 0.0
+        base_volume = cum_volume[end - 1] if end else 0.0
+        # The overflowing product always opens the next area, even if it exceeds capacity alone
+        end = max(end + 1, min(bisect_right(cum_weight, base_weight + max_weight, end),
+                               bisect_right(cum_volume, base_volume + max_volume, end)))
+    return breaks
+
+def _assign_areas(order, weights, volumes, max_weight, max_volume):
+    """Storage area number (starting at 1) of each product when filling areas in the given order."""
+    opens_area = np.zeros(len(order), dtype=np.intp)
+    opens_area[_area_breaks(order, weights, volumes, max_weight, max_volume)] = 1
+    return 1 + np.cumsum(opens_area)
+
+def _eval_storage(individual, weights, volumes, max_weight, max_volume):
+    """Fitness: number of storage areas needed when filling areas in the individual's order."""
+    if not individual:
+        return (0,)
+    num_areas = len(_area_breaks(individual, weights, volumes, max_weight, max_volume)) + 1
+    return (num_areas,)  # Minimize number of storage areas
+
+def _clone_individual(individual):
+    """Copy an individual for variation; genes are plain ints, so a shallow copy replaces deepcopy."""
+    clone = creator.Individual(individual)
+    clone.fitness.wvalues = individual.fitness.wvalues
+    return clone
+
+def _build_toolbox(n, weights, volumes, max_weight, max_volume):
+    """
+    Build the GA toolbox for one problem instance.
+    Args:
+        n (int): Number of products (only the index sampler depends on it).
+        weights, volumes (np.ndarray): Per-product weight and volume.
+        max_weight, max_volume (float): Capacity of a single storage area.
+    Returns:
+        deap.base.Toolbox: Toolbox with population, cloning, evaluation and variation operators registered.
+    """
+    toolbox = base.Toolbox()
+    toolbox.register("clone", _clone_individual)
+    toolbox.register("indices", random.sample, range(n), n)
+    toolbox.register("individual", tools.initIterate, creator.Individual, toolbox.indices)
+    toolbox.register("population", tools.initRepeat, list, toolbox.individual)
+    toolbox.register("evaluate", _eval_storage, weights=weights, volumes=volumes,
+                     max_weight=max_weight, max_volume=max_volume)
+    toolbox.register("mate", tools.cxPartialyMatched)
+    toolbox.register("mutate", tools.mutShuffleIndexes, indpb=0.2)
+    toolbox.register("select", tools.selTournament, tournsize=3)
+    return toolbox
+
+def _seed_population(toolbox, pop, warm_start, n):
+    """
+    Replace up to half of a population with warm-start orderings.
+    Each ordering may omit products (e.g. ones added since it was found); those are appended in
+    random order. Seeds are cycled to fill the slots, with repeats mutated to keep diversity.
+    """
+    seeds = []
+    for order in warm_start:
+        known = list(dict.fromkeys(i for i in order if 0 <= i < n))
+        known_set = set(known)
+        missing = [i for i in range(n) if i not in known_set]
+        random.shuffle(missing)
+        seeds.append(creator.Individual(known + missing))
+    for k in range(len(pop) // 2):
+        individual = toolbox.clone(seeds[k % len(seeds)])
+        if k >= len(seeds):
+            toolbox.mutate(individual)
+        pop[k] = individual
+
+def optimize_dispatch(products, constraints, volumes=None, warm_start=None, ngen=40):
     """
     Optimize storage layout and inventory placement using a genetic algorithm.
     Args:
         products (list of dict): List of product data.
         constraints (dict): Constraints for optimization.
+        volumes (np.ndarray, optional): Precomputed Length * Width * Height per product.
+        warm_start (list of list of int, optional): Earlier storage orders (indices into products) to seed the population.
+        ngen (int): Number of GA generations; warm-started runs typically need far fewer.
     Returns:
-        list of dict: Optimized storage plan.
+        list of dict: Optimized storage plan in storage order; 'Storage Area #' never decreases along it.
     """
     # Problem parameters
     n = len(products)
     max_weight = constraints.get('max_storage_weight', float('inf'))
     max_volume = constraints.get('storage_length', float('inf')) * constraints.get('storage_width', float('inf')) * constraints.get('storage_height', float('inf'))
-    volumes = [p['Length'] * p['Width'] * p['Height'] for p in products]
-    weights = [p['Weight'] for p in products]
+    if volumes is None:
+        dimensions = np.array([(p['Length'], p['Width'], p['Height']) for p in products], dtype=np.float64).reshape(n, 3)
+        volumes = dimensions.prod(axis=1)
+    else:
+        volumes = np.asarray(volumes, dtype=np.float64)
+    weights = np.fromiter((p['Weight'] for p in products), dtype=np.float64, count=n)
 
     # DEAP setup
-    creator.create("FitnessMin", base.Fitness, weights=(-1.0,))
-    creator.create("Individual", list, fitness=creator.FitnessMin)
-    toolbox = base.Toolbox()
-    toolbox.register("indices", random.sample, range(n), n)
-    toolbox.register("individual", tools.initIterate, creator.Individual, toolbox.indices)
-    toolbox.register("population", tools.initRepeat, list, toolbox.individual)
-
-    def eval_storage(individual):
-        storage_areas = []
-        current_area = []
-        current_weight = 0
-        current_volume = 0
-        for idx in individual:
-            w = weights[idx]
-            v = volumes[idx]
-            if current_weight + w > max_weight or current_volume + v > max_volume:
-                storage_areas.append(current_area)
-                current_area = []
-                current_weight = 0
-                current_volume = 0
-            current_area.append(idx)
-            current_weight += w
-            current_volume += v
-        if current_area:
-            storage_areas.append(current_area)
-        return (len(storage_areas),)  # Minimize number of storage areas
-
-    toolbox.register("evaluate", eval_storage)
-    toolbox.register("mate", tools.cxPartialyMatched)
-    toolbox.register("mutate", tools.mutShuffleIndexes, indpb=0.2)
-    toolbox.register("select", tools.selTournament, tournsize=3)
+    toolbox = _build_toolbox(n, weights, volumes, max_weight, max_volume)
 
     pop = toolbox.population(n=50)
+    if warm_start:
+        _seed_population(toolbox, pop, warm_start, n)
     hof = tools.HallOfFame(1)
     stats = tools.Statistics(lambda ind: ind.fitness.values)
     stats.register("min", np.min)
     stats.register("avg", np.mean)
 
-    algorithms.eaSimple(pop, toolbox, cxpb=0.7, mutpb=0.2, ngen=40, stats=stats, halloffame=hof, verbose=False)
+    algorithms.eaSimple(pop, toolbox, cxpb=0.7, mutpb=0.2, ngen=ngen, stats=stats, halloffame=hof, verbose=False)
 
     best = hof[0]
     # Assign storage order and area number
+    area_numbers = _assign_areas(best, weights, volumes, max_weight, max_volume).tolist()
     storage_plan = [dict(products[i]) for i in best]
-    # Assign storage area numbers
-    area_num = 1
-    current_weight = 0
-    current_volume = 0
-    for i, p in enumerate(storage_plan):
-        w = p['Weight']
-        v = p['Length'] * p['Width'] * p['Height']
-        if current_weight + w > max_weight or current_volume + v > max_volume:
-            area_num += 1
-            current_weight = 0
-            current_volume = 0
-        p['StorageOrder'] = i + 1
+    for order, (p, area_num) in enumerate(zip(storage_plan, area_numbers), start=1):
+        p['StorageOrder'] = order
         p['Storage Area #'] = area_num
-        current_weight += w
-        current_volume += v
-    return storage_plan 
\ No newline at end of file
+    return storage_plan
\ No newline at end of file
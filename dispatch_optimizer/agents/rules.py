@@ -3,6 +3,11 @@ rules.py
 Rule-based filtering engine for warehouse storage constraints (fragility, weight, priority, etc.).
 """
 
+from operator import itemgetter
+import numpy as np
+
+PRIORITY_ORDER = {'High': 0, 'Medium': 1, 'Low': 2}
+
 def apply_rules(products, constraints):
     """
     Apply rule-based filters to the product list based on storage constraints.
@@ -14,17 +19,31 @@ def apply_rules(products, constraints):
     """
     # Filter by max storage weight (cumulative)
     max_weight = constraints.get('max_storage_weight', float('inf'))
-    filtered = []
-    total_weight = 0
-    for p in products:
-        if total_weight + p['Weight'] <= max_weight:
-            filtered.append(p)
-            total_weight += p['Weight']
-    # Sort by priority if needed
-    if constraints.get('priority_first', False):
-        priority_order = {'High': 0, 'Medium': 1, 'Low': 2}
-        filtered.sort(key=lambda x: priority_order.get(x.get('Priority', 'Medium'), 1))
-    # Place fragile items on top if needed
-    if constraints.get('fragile_on_top', False):
+    weights = np.fromiter(map(itemgetter('Weight'), products), dtype=np.float64, count=len(products))
+    cum_weight = np.cumsum(weights)
+    # Every product before the first one that overflows is kept as one block
+    k = int(np.searchsorted(cum_weight, max_weight, side='right'))
+    filtered = list(products[:k])
+    if k < len(products):
+        total_weight = float(cum_weight[k - 1]) if k else 0
+        # Past the first overflow only products within the remaining capacity can still fit
+        candidates = np.flatnonzero(weights[k + 1:] <= (max_weight - total_weight) * (1 + 1e-9)) + k + 1
+        # Lightest candidate from each position on, to stop once nothing left can fit
+        lightest_after = np.minimum.accumulate(weights[candidates][::-1])[::-1].tolist()
+        for i, lightest in zip(candidates.tolist(), lightest_after):
+            if total_weight + lightest > max_weight:
+                break
+            p = products[i]
+            if total_weight + p['Weight'] <= max_weight:
+                filtered.append(p)
+                total_weight += p['Weight']
+    # Sort once on a composite key: fragile items first (if required), then by priority (if required)
+    priority_first = constraints.get('priority_first', False)
+    fragile_on_top = constraints.get('fragile_on_top', False)
+    if fragile_on_top and priority_first:
+        filtered.sort(key=lambda x: (not x.get('Fragile', False), PRIORITY_ORDER.get(x.get('Priority', 'Medium'), 1)))
+    elif priority_first:
+        filtered.sort(key=lambda x: PRIORITY_ORDER.get(x.get('Priority', 'Medium'), 1))
+    elif fragile_on_top:
         filtered.sort(key=lambda x: not x.get('Fragile', False))  # Fragile=True first
     return filtered 
\ No newline at end of file
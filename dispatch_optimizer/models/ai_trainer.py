@@ -5,67 +5,223 @@ Machine learning module to train the AI system on historical optimization data.
 
 import pandas as pd
 import numpy as np
-from sklearn.ensemble import RandomForestRegressor, RandomForestClassifier
+from sklearn.ensemble import HistGradientBoostingRegressor
 from sklearn.model_selection import train_test_split
-from sklearn.preprocessing import StandardScaler
 import joblib
 import os
 import io
+import csv
 import json
+import hashlib
+import time
+
+# Input CSV columns the feature extractor reads
+INPUT_COLUMNS = ['Weight', 'Length', 'Width', 'Height', 'Fragile', 'Priority']
+# 7 aggregated input features followed by 4 constraint settings
+NUM_FEATURES = 11
+# Smallest leaf the truck count model may grow
+MIN_SAMPLES_LEAF = 3
+# Bump whenever feature or target extraction changes; feature caches from other versions are discarded
+FEATURE_VERSION = 1
+
+def _csv_identity(source):
+    """CSV text as is, or a path's name, size and modification time so it is not read."""
+    if isinstance(source, os.PathLike):
+        stat = os.stat(source)
+        return f"{os.fspath(source)}:{stat.st_size}:{stat.st_mtime_ns}"
+    return source
+
+def _job_key(job):
+    """Digest of a job's input CSV, constraints and output CSV."""
+    digest = hashlib.sha1()
+    for part in (_csv_identity(job[2]), job[3], _csv_identity(job[4])):
+        digest.update(part.encode('utf-8'))
+        digest.update(b'\0')
+    return digest.hexdigest()
+
+def _csv_rows(source):
+    """Yield rows from CSV text, or stream them from a file path."""
+    if isinstance(source, os.PathLike):
+        with open(source, 'r', encoding='utf-8', newline='') as f:
+            yield from csv.reader(f)
+    else:
+        yield from csv.reader(io.StringIO(source))
+
+def _input_features(input_csv):
+    """
+    Aggregate one job's input CSV in a single pass over its rows.
+    Args:
+        input_csv (str or os.PathLike): CSV text, or the path of a CSV file
+    Returns:
+        list: total weight, total volume, product count, average weight,
+        average volume, fragile count and high priority count
+    """
+    reader = _csv_rows(input_csv)
+    header = next(reader)
+    weight_col, length_col, width_col, height_col, fragile_col, priority_col = (
+        header.index(column) for column in INPUT_COLUMNS
+    )
+    
+    num_products = weight_count = volume_count = fragile_count = high_priority_count = 0
+    total_weight = total_volume = 0.0
+    for row in reader:
+        if not row:
+            continue
+        num_products += 1
+        # Blank cells are missing values and are left out of sums and means
+        weight = row[weight_col]
+        if weight:
+            total_weight += float(weight)
+            weight_count += 1
+        length, width, height = row[length_col], row[width_col], row[height_col]
+        if length and width and height:
+            total_volume += float(length) * float(width) * float(height)
+            volume_count += 1
+        fragile_count += row[fragile_col] == 'Yes'
+        high_priority_count += row[priority_col] == 'High'
+    
+    avg_weight = total_weight / weight_count if weight_count else np.nan
+    avg_volume = total_volume / volume_count if volume_count else np.nan
+    return [total_weight, total_volume, num_products, avg_weight, avg_volume,
+            fragile_count, high_priority_count]
+
+def _output_targets(output_csv):
+    """
+    Read the training targets from one job's output CSV without building a DataFrame.
+    Args:
+        output_csv (str or os.PathLike): CSV text, or the path of a CSV file
+    Returns:
+        tuple: (trucks used, total dispatch time)
+    """
+    reader = _csv_rows(output_csv)
+    header = next(reader)
+    truck_col = header.index('Truck #') if 'Truck #' in header else None
+    
+    num_rows = 0
+    trucks_used = None
+    for row in reader:
+        if not row:
+            continue
+        num_rows += 1
+        # Missing truck numbers are skipped, as pandas' max() skipped NaN
+        if truck_col is not None and truck_col < len(row) and row[truck_col]:
+            truck = float(row[truck_col])
+            if trucks_used is None or truck > trucks_used:
+                trucks_used = truck
+    
+    if truck_col is None:
+        trucks_used = 1
+    elif trucks_used is None:
+        trucks_used = np.nan
+    total_dispatch_time = num_rows  # Simplified metric
+    return trucks_used, total_dispatch_time
+
+def _deduplicate_rows(X, targets):
+    """
+    Collapse identical training rows.
+    Returns:
+        tuple: (unique X rows, their targets, how often each row occurred)
+    """
+    row_index = {}
+    keep = []
+    counts = []
+    for i in range(len(X)):
+        key = X[i].tobytes() + targets[i].tobytes()
+        j = row_index.get(key)
+        if j is None:
+            row_index[key] = len(keep)
+            keep.append(i)
+            counts.append(1)
+        else:
+            counts[j] += 1
+    return X[keep], targets[keep], np.array(counts, dtype=np.float64)
 
 class AITrainer:
-    def __init__(self):
-        self.weight_predictor = RandomForestRegressor(n_estimators=100, random_state=42)
-        self.volume_predictor = RandomForestRegressor(n_estimators=100, random_state=42)
-        self.truck_count_predictor = RandomForestRegressor(n_estimators=100, random_state=42)
-        self.optimization_improver = RandomForestClassifier(n_estimators=100, random_state=42)
-        self.scaler = StandardScaler()
+    def __init__(self, feature_cache_path=None):
+        # Stored training sets are tens of jobs: the default 20-sample leaves would keep every
+        # tree a single leaf, and sklearn only holds out an early stopping split past 10k rows
+        self.truck_count_predictor = HistGradientBoostingRegressor(
+            max_iter=200, max_bins=64, min_samples_leaf=MIN_SAMPLES_LEAF, early_stopping='auto',
+            random_state=42
+        )
+        # Only set for models saved before training dropped feature scaling
+        self.scaler = None
         self.is_trained = False
+        # Changes whenever a different model is trained or loaded; lets callers key caches on it
+        self.model_version = None
+        # Feature/target rows per job digest; optionally persisted between runs
+        self.feature_cache_path = feature_cache_path
+        self._job_rows = None
         
     def prepare_training_data(self, historical_jobs):
         """
         Prepare training data from historical optimization jobs.
         Args:
-            historical_jobs (list): List of job data from database
+            historical_jobs (list): List of job data from database; the input and
+                output CSVs may also be given as file paths (os.PathLike)
         Returns:
             tuple: (X_features, y_targets)
         """
-        features = []
-        targets = []
-        
-        for job in historical_jobs:
-            # Parse job data
-            input_data = pd.read_csv(io.StringIO(job[2]))  # input_csv
-            constraints = json.loads(job[3])  # constraints
-            output_data = pd.read_csv(io.StringIO(job[4]))  # output_csv
-            
-            # Extract features
-            total_weight = input_data['Weight'].sum()
-            total_volume = (input_data['Length'] * input_data['Width'] * input_data['Height']).sum()
-            num_products = len(input_data)
-            avg_weight = input_data['Weight'].mean()
-            avg_volume = (input_data['Length'] * input_data['Width'] * input_data['Height']).mean()
-            fragile_count = (input_data['Fragile'] == 'Yes').sum()
-            high_priority_count = (input_data['Priority'] == 'High').sum()
-            
-            # Extract targets from output
-            trucks_used = output_data['Truck #'].max() if 'Truck #' in output_data.columns else 1
-            total_dispatch_time = len(output_data)  # Simplified metric
+        if not historical_jobs:
+            return np.array([]), np.array([])
+        
+        if self._job_rows is None:
+            self._job_rows = self._load_feature_cache()
+        
+        # Only parse jobs that have not been seen before
+        keys = [_job_key(job) for job in historical_jobs]
+        new_jobs = {}
+        for key, job in zip(keys, historical_jobs):
+            if key not in self._job_rows and key not in new_jobs:
+                new_jobs[key] = job
+        if new_jobs:
+            features, targets = self._extract_job_rows(list(new_jobs.values()))
+            self._job_rows.update(zip(new_jobs, zip(features, targets)))
+            self._save_feature_cache()
+        
+        X = np.empty((len(keys), NUM_FEATURES), dtype=np.float32)
+        y = np.empty((len(keys), 2), dtype=np.float64)
+        for i, key in enumerate(keys):
+            X[i], y[i] = self._job_rows[key]
+        return X, y
+    
+    def _extract_job_rows(self, historical_jobs):
+        """Parse jobs into per-job feature and target rows."""
+        features = np.empty((len(historical_jobs), NUM_FEATURES), dtype=np.float32)
+        targets = np.empty((len(historical_jobs), 2), dtype=np.float64)
+        
+        for i, job in enumerate(historical_jobs):
+            features[i, :7] = _input_features(job[2])  # input_csv
             
-            # Create feature vector
-            feature_vector = [
-                total_weight, total_volume, num_products, avg_weight, avg_volume,
-                fragile_count, high_priority_count,
-                constraints.get('max_truck_weight', 1000),
-                constraints.get('max_truck_volume', 10000),
-                constraints.get('fragile_on_top', True),
-                constraints.get('priority_first', True)
-            ]
+            c = json.loads(job[3])  # constraints
+            features[i, 7:] = (
+                c.get('max_truck_weight', 1000),
+                c.get('max_truck_volume', 10000),
+                c.get('fragile_on_top', True),
+                c.get('priority_first', True)
+            )
             
-            features.append(feature_vector)
-            targets.append([trucks_used, total_dispatch_time])
+            targets[i] = _output_targets(job[4])  # output_csv
         
-        return np.array(features), np.array(targets)
+        return features, targets
+    
+    def _load_feature_cache(self):
+        """Load cached job rows from disk, if a cache path is configured and its FEATURE_VERSION matches."""
+        if self.feature_cache_path and os.path.exists(self.feature_cache_path):
+            try:
+                cache = joblib.load(self.feature_cache_path)
+                if cache.get('version') == FEATURE_VERSION:
+                    return cache['rows']
+            except Exception:
+                pass
+        return {}
+    
+    def _save_feature_cache(self):
+        """Persist cached job rows so later runs skip re-parsing."""
+        if not self.feature_cache_path:
+            return
+        os.makedirs(os.path.dirname(self.feature_cache_path) or '.', exist_ok=True)
+        joblib.dump({'version': FEATURE_VERSION, 'rows': self._job_rows}, self.feature_cache_path)
     
     def train(self, historical_jobs):
         """
@@ -79,24 +235,32 @@ class AITrainer:
             
         X, y = self.prepare_training_data(historical_jobs)
         
-        # Split data
-        X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42)
+        # Only the truck count is learned; take it as a contiguous vector once
+        # instead of handing strided y[:, 0] views to every fit and score call
+        trucks = np.ascontiguousarray(y[:, 0])
+        
+        # Duplicate jobs give identical rows; keep one of each, weighted by its count
+        X, trucks, weights = _deduplicate_rows(X, trucks)
+        if len(X) < 10:
+            print("Need at least 10 historical jobs for training")
+            return False
         
-        # Scale features
-        X_train_scaled = self.scaler.fit_transform(X_train)
-        X_test_scaled = self.scaler.transform(X_test)
+        # Split data
+        X_train, X_test, trucks_train, trucks_test, weights_train, weights_test = train_test_split(
+            X, trucks, weights, test_size=0.2, random_state=42
+        )
         
         # Train models
-        self.truck_count_predictor.fit(X_train_scaled, y_train[:, 0])
-        self.optimization_improver.fit(X_train_scaled, y_train[:, 0])
+        self.truck_count_predictor.fit(X_train, trucks_train, sample_weight=weights_train)
         
         # Evaluate
-        train_score = self.truck_count_predictor.score(X_train_scaled, y_train[:, 0])
-        test_score = self.truck_count_predictor.score(X_test_scaled, y_test[:, 0])
+        train_score = self.truck_count_predictor.score(X_train, trucks_train, sample_weight=weights_train)
+        test_score = self.truck_count_predictor.score(X_test, trucks_test, sample_weight=weights_test)
         
         print(f"Training completed! Train score: {train_score:.3f}, Test score: {test_score:.3f}")
         
         self.is_trained = True
+        self.model_version = time.time()
         return True
     
     def predict_optimization_quality(self, products, constraints):
@@ -108,20 +272,51 @@ class AITrainer:
         Returns:
             dict: Predictions and recommendations
         """
+        return self.predict_optimization_quality_batch([(products, constraints)])[0]
+    
+    def predict_optimization_quality_batch(self, scenarios):
+        """
+        Predict optimization quality for several scenarios with one model call.
+        Args:
+            scenarios (list): (products, constraints) pairs
+        Returns:
+            list: One predictions dict per scenario, in order
+        """
         if not self.is_trained:
-            return {"error": "Model not trained yet"}
+            return [{"error": "Model not trained yet"} for _ in scenarios]
+        if not scenarios:
+            return []
+        
+        feature_rows = [self._product_features(products, constraints) for products, constraints in scenarios]
+        
+        # Tree models are scale-invariant; only legacy models expect scaled input
+        model_input = np.array(feature_rows, dtype=np.float32)
+        if self.scaler is not None:
+            model_input = self.scaler.transform(model_input)
         
-        # Prepare features
+        predicted = self.truck_count_predictor.predict(model_input)
+        
+        return [
+            {
+                "predicted_trucks": int(predicted_trucks),
+                "recommendations": self._generate_recommendations(features)
+            }
+            for predicted_trucks, features in zip(predicted, feature_rows)
+        ]
+    
+    def _product_features(self, products, constraints):
+        """Build the 11-value model input for one set of products and constraints."""
         df = pd.DataFrame(products)
+        volume = df['Length'] * df['Width'] * df['Height']
         total_weight = df['Weight'].sum()
-        total_volume = (df['Length'] * df['Width'] * df['Height']).sum()
+        total_volume = volume.sum()
         num_products = len(df)
         avg_weight = df['Weight'].mean()
-        avg_volume = (df['Length'] * df['Width'] * df['Height']).mean()
+        avg_volume = volume.mean()
         fragile_count = (df['Fragile'] == True).sum()
         high_priority_count = (df['Priority'] == 'High').sum()
         
-        features = [
+        return [
             total_weight, total_volume, num_products, avg_weight, avg_volume,
             fragile_count, high_priority_count,
             constraints.get('max_truck_weight', 1000),
@@ -129,17 +324,6 @@ class AITrainer:
             constraints.get('fragile_on_top', True),
             constraints.get('priority_first', True)
         ]
-        
-        features_scaled = self.scaler.transform([features])
-        
-        predicted_trucks = self.truck_count_predictor.predict(features_scaled)[0]
-        optimization_confidence = self.optimization_improver.predict_proba(features_scaled)[0]
-        
-        return {
-            "predicted_trucks": int(predicted_trucks),
-            "optimization_confidence": float(max(optimization_confidence)),
-            "recommendations": self._generate_recommendations(features)
-        }
     
     def _generate_recommendations(self, features):
         """Generate optimization recommendations based on features."""
@@ -163,17 +347,18 @@ class AITrainer:
             
         os.makedirs(path, exist_ok=True)
         joblib.dump(self.truck_count_predictor, f"{path}/truck_predictor.pkl")
-        joblib.dump(self.optimization_improver, f"{path}/optimization_improver.pkl")
-        joblib.dump(self.scaler, f"{path}/scaler.pkl")
+        # A scaler left over from an older save would be applied to the new model's input
+        if os.path.exists(f"{path}/scaler.pkl"):
+            os.remove(f"{path}/scaler.pkl")
         return True
     
     def load_models(self, path="models/trained_models"):
         """Load trained models from disk."""
         try:
             self.truck_count_predictor = joblib.load(f"{path}/truck_predictor.pkl")
-            self.optimization_improver = joblib.load(f"{path}/optimization_improver.pkl")
-            self.scaler = joblib.load(f"{path}/scaler.pkl")
+            self.scaler = joblib.load(f"{path}/scaler.pkl") if os.path.exists(f"{path}/scaler.pkl") else None
             self.is_trained = True
+            self.model_version = os.path.getmtime(f"{path}/truck_predictor.pkl")
             return True
         except:
             return False 
\ No newline at end of file
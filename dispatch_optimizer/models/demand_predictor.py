@@ -3,6 +3,7 @@ demand_predictor.py
 Placeholder for ML-based demand forecasting (optional, for future use).
 """
 
+import numpy as np
 import pandas as pd
 
 def predict_demand(product_history):
@@ -16,6 +17,13 @@ def predict_demand(product_history):
     df = pd.DataFrame(product_history)
     if 'Product' not in df or 'Quantity' not in df:
         return {}
-    # Group by product and take mean quantity as prediction
-    demand = df.groupby('Product')['Quantity'].mean().to_dict()
+    # Mean quantity per product from integer codes instead of a hash groupby
+    codes, products = pd.factorize(df['Product'], sort=True)
+    quantities = df['Quantity'].to_numpy(dtype=np.float64)
+    valid = (codes >= 0) & ~np.isnan(quantities)
+    sums = np.bincount(codes[valid], weights=quantities[valid], minlength=len(products))
+    counts = np.bincount(codes[valid], minlength=len(products))
+    means = np.full(len(products), np.nan)
+    np.divide(sums, counts, out=means, where=counts > 0)
+    demand = dict(zip(products, means))
     return demand 
\ No newline at end of file
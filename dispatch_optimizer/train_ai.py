@@ -10,15 +10,18 @@ import os
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
 from models.ai_trainer import AITrainer
-from utils.job_db import list_jobs, get_job_by_id
+from utils.job_db import list_jobs, get_jobs_bulk
 import json
 
+# Parsed per-job features are kept here so retraining only parses new jobs
+FEATURE_CACHE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), '.cache', 'training_features.pkl')
+
 def main():
     print("🤖 AI Training for Dispatch Optimization System")
     print("=" * 50)
     
     # Initialize trainer
-    trainer = AITrainer()
+    trainer = AITrainer(feature_cache_path=FEATURE_CACHE_PATH)
     
     # Load historical jobs
     print("📊 Loading historical optimization jobs...")
@@ -32,11 +35,7 @@ def main():
     print(f"✅ Found {len(jobs)} historical jobs")
     
     # Get full job data
-    historical_data = []
-    for job_id, timestamp in jobs:
-        job_data = get_job_by_id(job_id)
-        if job_data:
-            historical_data.append(job_data)
+    historical_data = get_jobs_bulk(job_id for job_id, timestamp in jobs)
     
     print(f"📈 Preparing training data from {len(historical_data)} jobs...")
     
@@ -71,7 +70,6 @@ def main():
             if "error" not in prediction:
                 print(f"📊 Sample prediction:")
                 print(f"   Predicted trucks needed: {prediction['predicted_trucks']}")
-                print(f"   Optimization confidence: {prediction['optimization_confidence']:.2%}")
                 if prediction['recommendations']:
                     print(f"   Recommendations: {', '.join(prediction['recommendations'])}")
         
@@ -1,11 +1,16 @@
 import os
+import glob
 import json
+from pathlib import Path
 import pandas as pd
 from models.ai_trainer import AITrainer
 
 # Path to data folder
 DATA_DIR = os.path.join(os.path.dirname(__file__), 'data')
 
+# Parsed per-job features are kept here so retraining only parses new CSVs
+FEATURE_CACHE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), '.cache', 'training_features.pkl')
+
 # Dummy constraints
 default_constraints = {
     "max_truck_weight": 1000,
@@ -16,19 +21,15 @@ default_constraints = {
 
 def main():
     print("🤖 Training AI model from all CSVs in data/ folder...")
-    trainer = AITrainer()
-    job_tuples = []
-
-    for filename in os.listdir(DATA_DIR):
-        if filename.endswith('.csv'):
-            file_path = os.path.join(DATA_DIR, filename)
-            with open(file_path, 'r', encoding='utf-8') as f:
-                input_csv = f.read()
-            # Use input as dummy output
-            output_csv = input_csv
-            constraints_json = json.dumps(default_constraints)
-            # Tuple: (id, timestamp, input_csv, constraints, output_csv)
-            job_tuples.append((None, None, input_csv, constraints_json, output_csv))
+    trainer = AITrainer(feature_cache_path=FEATURE_CACHE_PATH)
+
+    # Jobs carry file paths; the trainer streams each CSV when it needs it
+    paths = [Path(p) for p in glob.glob(os.path.join(DATA_DIR, '*.csv'))]
+
+    # Every job shares the same dummy constraints string
+    constraints_json = json.dumps(default_constraints)
+    # Tuple: (id, timestamp, input_csv, constraints, output_csv), using input as dummy output
+    job_tuples = [(None, None, path, constraints_json, path) for path in paths]
 
     print(f"Found {len(job_tuples)} CSV files for training.")
     if len(job_tuples) < 10:
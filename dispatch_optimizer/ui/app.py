@@ -4,6 +4,7 @@ sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')
 import streamlit as st
 import pandas as pd
 import json
+import hashlib
 import plotly.graph_objects as go
 from dispatch_optimizer.utils.data_parser import parse_product_csv
 from dispatch_optimizer.agents.rules import apply_rules
@@ -12,21 +13,135 @@ from dispatch_optimizer.agents.dispatch_planner import DispatchPlanner
 from dispatch_optimizer.agents.dynamic_optimizer import DynamicOptimizer
 from dispatch_optimizer.visualizations.layout_plotter import plot_layout, plot_layout_3d
 from dispatch_optimizer.visualizations.dispatch_sequence import plot_dispatch_sequence
-from dispatch_optimizer.visualizations.route_visualizer import (
-    plot_route_map, plot_route_timeline, plot_vehicle_utilization, 
-    plot_cost_breakdown, plot_delivery_heatmap, plot_route_efficiency
-)
 from dispatch_optimizer.models.demand_predictor import predict_demand
 from dispatch_optimizer.models.ai_trainer import AITrainer
 from dispatch_optimizer.utils.job_db import (
-    init_db, save_job, list_jobs, get_job_by_id, save_dispatch_routes, get_latest_dispatch_routes,
+    init_db, save_job, list_jobs, list_job_summaries, get_job_summary, get_job_by_id, save_dispatch_routes, get_latest_dispatch_routes,
+    get_latest_dispatch_routes_id,
     list_drivers, add_driver, update_driver, delete_driver,
     list_vehicles, add_vehicle, update_vehicle, delete_vehicle
 )
-import io
 import threading
 import time
 
+# Product fields the AI model reads; cached predictions are keyed on these alone
+PREDICTION_FIELDS = ('Weight', 'Length', 'Width', 'Height', 'Fragile', 'Priority')
+
+# Streamlit hashes cache_data arguments itself, which takes ~0.4 s for a 35k-product key,
+# so the rows are passed unhashed and identified by their Python hash instead
+@st.cache_data(show_spinner=False, max_entries=64)
+def _cached_prediction(_trainer, model_version, _products_key, products_hash, constraints_key):
+    products = [dict(zip(PREDICTION_FIELDS, row)) for row in _products_key]
+    return _trainer.predict_optimization_quality(products, dict(constraints_key))
+
+def predict_quality(products, constraints):
+    """AI prediction that is reused across reruns while products, constraints and model are unchanged."""
+    products_key = tuple(tuple(p.get(field) for field in PREDICTION_FIELDS) for p in products)
+    constraints_key = tuple(sorted(constraints.items()))
+    products_hash = hash(products_key)
+    key = (products_hash, constraints_key, ai_trainer.model_version)
+    # Unchanged inputs since an earlier run in this session skip the cache lookup entirely
+    predictions = st.session_state.setdefault('predictions', {})
+    if key not in predictions:
+        if len(predictions) >= 16:
+            predictions.clear()
+        predictions[key] = _cached_prediction(ai_trainer, ai_trainer.model_version,
+                                              products_key, products_hash, constraints_key)
+    return predictions[key]
+
+def route_figure(dispatch_routes, plot):
+    """Figure from a route plot function, built once per routes object and reused across reruns."""
+    cached_routes, figures = st.session_state.get('route_figures', (None, {}))
+    if cached_routes is not dispatch_routes:
+        figures = {}
+        st.session_state['route_figures'] = (dispatch_routes, figures)
+    if plot.__name__ not in figures:
+        figures[plot.__name__] = plot(dispatch_routes)
+    return figures[plot.__name__]
+
+def saved_dispatch_routes():
+    """Latest routes saved to the database, loaded once per saved row so reruns reuse the same objects."""
+    latest_id = get_latest_dispatch_routes_id()
+    if latest_id is None:
+        return None
+    saved = st.session_state.get('saved_dispatch_routes')
+    if saved is None or saved['id'] != latest_id:
+        saved = get_latest_dispatch_routes()
+        st.session_state['saved_dispatch_routes'] = saved
+    return saved
+
+def route_stop_lists(dispatch_routes):
+    """Numbered markdown list of each route's stops, built once per routes object and reused across reruns."""
+    cached_routes, stop_lists = st.session_state.get('route_stop_lists', (None, None))
+    if cached_routes is not dispatch_routes:
+        stop_lists = [
+            "\n".join(
+                f"{j+1}. {product.get('Product', 'Unknown')} - {product.get('Weight', 0)} lbs - Priority: {product.get('Priority', 'Medium')}"
+                for j, stop in enumerate(route.get('route', []))
+                for product in (stop.get('product', {}),)
+            )
+            for route in dispatch_routes
+        ]
+        st.session_state['route_stop_lists'] = (dispatch_routes, stop_lists)
+    return stop_lists
+
+# DB reads repeated on every rerun; the add/update/delete handlers below clear them
+@st.cache_data(ttl=30, show_spinner=False)
+def _cached_vehicles():
+    return list_vehicles()
+
+@st.cache_data(ttl=30, show_spinner=False)
+def _cached_drivers():
+    return list_drivers()
+
+JOBS_PAGE_SIZE = 50
+
+@st.cache_data(ttl=30, show_spinner=False)
+def _cached_jobs(page=1):
+    return list_jobs(limit=JOBS_PAGE_SIZE, offset=(page - 1) * JOBS_PAGE_SIZE)
+
+@st.cache_data(ttl=30, show_spinner=False)
+def _cached_job_summaries():
+    return list_job_summaries()
+
+# Fleet panel button callbacks; they run before the panel fragment reruns
+def remove_vehicle(vehicle_id):
+    delete_vehicle(vehicle_id)
+    _cached_vehicles.clear()
+    # A fresh table key drops the selection, which would otherwise move to the next vehicle
+    st.session_state['vehicles_table_version'] = st.session_state.get('vehicles_table_version', 0) + 1
+
+def save_new_vehicle():
+    # Read the form from session_state: callback args would hold the values from before the click
+    form = st.session_state
+    add_vehicle({
+        'id': form['add_vehicle_id'],
+        'capacity_weight': form['add_vehicle_weight'],
+        'capacity_volume': form['add_vehicle_volume'],
+        'fuel_efficiency': form['add_vehicle_eff'],
+        'operating_cost_per_km': form['add_vehicle_cost'],
+        'available': form['add_vehicle_avail']
+    })
+    _cached_vehicles.clear()
+    st.toast(f"Truck {form['add_vehicle_id']} added!")
+
+def remove_driver(driver_id):
+    delete_driver(driver_id)
+    _cached_drivers.clear()
+    st.session_state['drivers_table_version'] = st.session_state.get('drivers_table_version', 0) + 1
+
+def save_new_driver():
+    form = st.session_state
+    add_driver({
+        'id': form['add_driver_id'],
+        'name': form['add_driver_name'],
+        'max_hours': form['add_driver_hours'],
+        'hourly_rate': form['add_driver_rate'],
+        'available': form['add_driver_avail']
+    })
+    _cached_drivers.clear()
+    st.toast(f"Driver {form['add_driver_name']} added!")
+
 def force_rerun():
     st.session_state['force_rerun'] = not st.session_state.get('force_rerun', False)
     st.stop()
@@ -56,14 +171,19 @@ ItemB,15,3.2,2.1,1.5,No,ZoneB,Low,2025-07-12
 - **Destination should be warehouse zones (e.g., ZoneA, ZoneB, Rack1, etc.)**
 """)
 
-# Initialize components
+# Initialize components once per session so their state survives reruns
 init_db()
-ai_trainer = AITrainer()
-dispatch_planner = DispatchPlanner()
-dynamic_optimizer = DynamicOptimizer()
+if 'dispatch_planner' not in st.session_state:
+    st.session_state['ai_trainer'] = AITrainer()
+    # Try to load pre-trained models
+    st.session_state['model_loaded'] = st.session_state['ai_trainer'].load_models()
+    st.session_state['dispatch_planner'] = DispatchPlanner()
+    st.session_state['dynamic_optimizer'] = DynamicOptimizer()
+ai_trainer = st.session_state['ai_trainer']
+dispatch_planner = st.session_state['dispatch_planner']
+dynamic_optimizer = st.session_state['dynamic_optimizer']
 
-# Try to load pre-trained models
-model_loaded = ai_trainer.load_models()
+model_loaded = st.session_state['model_loaded']
 if model_loaded:
     st.sidebar.success("🤖 AI Models Loaded - Enhanced Predictions Available")
 else:
@@ -76,29 +196,33 @@ if 'uploaded_products' not in st.session_state:
     st.session_state['uploaded_products'] = None
 uploaded_file = st.file_uploader("Upload Product CSV", type=["csv"], key="unified_upload")
 if uploaded_file is not None:
-    st.session_state['uploaded_products'] = parse_product_csv(uploaded_file)
-    # Reset dynamic optimizer state and session flag
-    dynamic_optimizer.reset_state()
-    if 'dynamic_products_loaded' in st.session_state:
-        del st.session_state['dynamic_products_loaded']
+    # Parse and ingest each upload once; later reruns keep the session's products and optimizer state
+    if st.session_state.get('uploaded_file_id') != uploaded_file.file_id:
+        st.session_state['uploaded_file_id'] = uploaded_file.file_id
+        # Re-uploading identical content keeps the products already parsed from it
+        uploaded_bytes = uploaded_file.getvalue()
+        uploaded_digest = hashlib.blake2b(uploaded_bytes, digest_size=16).digest()
+        if st.session_state.get('uploaded_digest') != uploaded_digest:
+            st.session_state['uploaded_digest'] = uploaded_digest
+            st.session_state['uploaded_products'] = parse_product_csv(uploaded_file)
+            # Keep the original CSV text so saved jobs store it as uploaded
+            st.session_state['uploaded_csv'] = uploaded_bytes.decode('utf-8')
+        # Reset dynamic optimizer state; the upload is ingested below and nowhere else
+        dynamic_optimizer.reset_state()
+        # Always load latest vehicles and drivers before optimization
+        vehicles = _cached_vehicles()
+        drivers = _cached_drivers()
+        dynamic_optimizer.dispatch_planner.set_vehicles(vehicles)
+        dynamic_optimizer.dispatch_planner.set_drivers(drivers)
+        # Automatically run optimization after upload
+        if st.session_state['uploaded_products']:
+            dynamic_optimizer.add_events([
+                {'type': 'goods_in', 'product': product, 'location': product.get('Destination', 'Receiving')}
+                for product in st.session_state['uploaded_products']
+            ])
+            # Optimize on a worker thread so the page renders while large uploads are planned
+            dynamic_optimizer.optimize_in_background()
     st.success(f"Loaded {len(st.session_state['uploaded_products'])} products from CSV.")
-    # Always load latest vehicles and drivers before optimization
-    vehicles = list_vehicles()
-    drivers = list_drivers()
-    dynamic_optimizer.dispatch_planner.set_vehicles(vehicles)
-    dynamic_optimizer.dispatch_planner.set_drivers(drivers)
-    # Automatically run optimization after upload
-    if st.session_state['uploaded_products']:
-        for idx, product in enumerate(st.session_state['uploaded_products']):
-            event = {
-                'type': 'goods_in',
-                'product': product,
-                'location': product.get('Destination', 'Receiving')
-            }
-            dynamic_optimizer.add_event(event)
-        dynamic_optimizer._process_events()
-        dynamic_optimizer._perform_optimization()
-        st.session_state['dynamic_products_loaded'] = True
 
 products = st.session_state['uploaded_products']
 
@@ -136,14 +260,12 @@ with tab1:
         
         # AI predictions
         if ai_trainer.is_trained:
-            predictions = ai_trainer.predict_optimization_quality(products, constraints)
+            predictions = predict_quality(products, constraints)
             if 'error' not in predictions:
-                col1, col2, col3 = st.columns(3)
+                col1, col2 = st.columns(2)
                 with col1:
                     st.metric("Predicted Storage Areas", predictions.get('predicted_trucks', 0))
                 with col2:
-                    st.metric("Optimization Confidence", f"{predictions.get('optimization_confidence', 0)*100:.1f}%")
-                with col3:
                     st.metric("AI Recommendations", len(predictions.get('recommendations', [])))
             else:
                 st.info("AI model is not trained. Please train the model for predictions.")
@@ -160,13 +282,17 @@ with tab1:
             
             st.write("### Optimized Storage Plan")
             
+            # One DataFrame of the plan serves the metrics, the saved job and the download
+            plan_df = pd.DataFrame(optimized_plan)
+            
             # Show optimization results
-            actual_storage_areas = max(p.get('Storage Area #', 1) for p in optimized_plan)
+            # The plan is in storage order, so the last product sits in the highest-numbered area
+            actual_storage_areas = optimized_plan[-1]['Storage Area #'] if optimized_plan else 0
             st.metric("Actual Storage Areas Used", actual_storage_areas)
             
             # Storage utilization metrics
-            total_volume = sum(p['Length'] * p['Width'] * p['Height'] for p in optimized_plan)
-            total_weight = sum(p['Weight'] for p in optimized_plan)
+            total_volume = float((plan_df['Length'] * plan_df['Width'] * plan_df['Height']).sum())
+            total_weight = float(plan_df['Weight'].sum())
             storage_volume = constraints['storage_length'] * constraints['storage_width'] * constraints['storage_height']
             volume_utilization = (total_volume / storage_volume) * 100
             weight_utilization = (total_weight / constraints['max_storage_weight']) * 100
@@ -185,19 +311,18 @@ with tab1:
             st.plotly_chart(plot_dispatch_sequence(optimized_plan), use_container_width=True, key="dispatch_sequence")
             
             # Save job to database
-            input_csv = pd.DataFrame(products).to_csv(index=False)
+            input_csv = st.session_state.get('uploaded_csv') or pd.DataFrame(products).to_csv(index=False)
             constraints_json = json.dumps(constraints)
-            output_csv = pd.DataFrame(optimized_plan).to_csv(index=False)
+            output_csv = plan_df.to_csv(index=False)
             job_id = save_job(input_csv, constraints_json, output_csv)
+            _cached_jobs.clear()
+            _cached_job_summaries.clear()
             st.success(f"✅ Storage optimization job saved with ID: {job_id}")
             
             # Download button
-            output_df = pd.DataFrame(optimized_plan)
-            csv_buffer = io.StringIO()
-            output_df.to_csv(csv_buffer, index=False)
             st.download_button(
                 label="Download Optimized Storage Plan",
-                data=csv_buffer.getvalue(),
+                data=output_csv,
                 file_name="optimized_storage_plan.csv",
                 mime="text/csv"
             )
@@ -223,14 +348,12 @@ with tab2:
         
         # AI predictions for dispatch planning
         if ai_trainer.is_trained:
-            predictions = ai_trainer.predict_optimization_quality(products, dispatch_constraints)
+            predictions = predict_quality(products, dispatch_constraints)
             if 'error' not in predictions:
-                col1, col2, col3 = st.columns(3)
+                col1, col2 = st.columns(2)
                 with col1:
                     st.metric("Predicted Trucks Needed", predictions.get('predicted_trucks', 0))
                 with col2:
-                    st.metric("Optimization Confidence", f"{predictions.get('optimization_confidence', 0)*100:.1f}%")
-                with col3:
                     st.metric("AI Recommendations", len(predictions.get('recommendations', [])))
             else:
                 st.info("AI model is not trained. Please train the model for predictions.")
@@ -239,11 +362,11 @@ with tab2:
         
         # Show sample products
         if st.checkbox("Show sample products"):
-            st.dataframe(pd.DataFrame(products).head(10))
+            st.dataframe(pd.DataFrame(products[:10]))
         
         # Inject persistent vehicles and drivers
-        persistent_vehicles = list_vehicles()
-        persistent_drivers = list_drivers()
+        persistent_vehicles = _cached_vehicles()
+        persistent_drivers = _cached_drivers()
         dispatch_planner.set_vehicles(persistent_vehicles)
         dispatch_planner.set_drivers(persistent_drivers)
         
@@ -277,7 +400,7 @@ with tab2:
                 with col1:
                     st.metric("Total Routes", route_summary.get('total_routes', 0))
                 with col2:
-                    st.metric("Total Distance", f"{route_summary.get('total_distance', 0) * 1.60934 if route_summary else 0:.1f} km")
+                    st.metric("Total Distance", f"{route_summary.get('total_distance', 0) if route_summary else 0:.1f} km")
                 with col3:
                     st.metric("Total Cost", f"₹{route_summary.get('total_cost', 0) if route_summary else 0:.2f}")
                 with col4:
@@ -285,11 +408,12 @@ with tab2:
 
                 # Route details
                 st.subheader("🚛 Route Details")
+                stop_lists = route_stop_lists(dispatch_routes)
                 for i, route in enumerate(dispatch_routes):
                     with st.expander(f"Route {i+1}: {route.get('vehicle_id')} - {route.get('driver_name')}"):
                         col1, col2, col3 = st.columns(3)
                         with col1:
-                            st.metric("Distance", f"{route.get('total_distance', 0) * 1.60934:.1f} km")
+                            st.metric("Distance", f"{route.get('total_distance_km', 0):.1f} km")
                             st.metric("Duration", f"{route.get('estimated_duration', 0):.1f} hours")
                         with col2:
                             st.metric("Cost", f"₹{route.get('total_cost', 0):.2f}")
@@ -299,42 +423,40 @@ with tab2:
                             st.metric("Volume", f"{route.get('total_volume', 0):.1f} ft³")
                         # Route stops
                         st.write("**Delivery Stops:**")
-                        for j, stop in enumerate(route.get('route', [])):
-                            product = stop.get('product', {})
-                            st.write(f"{j+1}. {product.get('Product', 'Unknown')} - {product.get('Weight', 0)} lbs - Priority: {product.get('Priority', 'Medium')}")
+                        if stop_lists[i]:
+                            st.markdown(stop_lists[i])
 
-                # Route visualizations
+                # Route visualizations; imported here so runs without routes never load the module
+                from dispatch_optimizer.visualizations.route_visualizer import (
+                    plot_route_map, plot_route_timeline, plot_vehicle_utilization,
+                    plot_cost_breakdown, plot_delivery_heatmap, plot_route_efficiency
+                )
                 st.subheader("🗺️ Route Visualizations")
-                st.plotly_chart(plot_route_map(dispatch_routes), use_container_width=True, key="dispatch_route_map")
-                st.plotly_chart(plot_route_timeline(dispatch_routes), use_container_width=True, key="dispatch_route_timeline")
-                st.plotly_chart(plot_vehicle_utilization(dispatch_routes), use_container_width=True, key="dispatch_vehicle_utilization")
-                st.plotly_chart(plot_cost_breakdown(dispatch_routes), use_container_width=True, key="dispatch_cost_breakdown")
-                st.plotly_chart(plot_delivery_heatmap(dispatch_routes), use_container_width=True, key="dispatch_delivery_heatmap")
-                st.plotly_chart(plot_route_efficiency(dispatch_routes), use_container_width=True, key="dispatch_route_efficiency")
+                st.plotly_chart(route_figure(dispatch_routes, plot_route_map), use_container_width=True, key="dispatch_route_map")
+                st.plotly_chart(route_figure(dispatch_routes, plot_route_timeline), use_container_width=True, key="dispatch_route_timeline")
+                st.plotly_chart(route_figure(dispatch_routes, plot_vehicle_utilization), use_container_width=True, key="dispatch_vehicle_utilization")
+                st.plotly_chart(route_figure(dispatch_routes, plot_cost_breakdown), use_container_width=True, key="dispatch_cost_breakdown")
+                st.plotly_chart(route_figure(dispatch_routes, plot_delivery_heatmap), use_container_width=True, key="dispatch_delivery_heatmap")
+                st.plotly_chart(route_figure(dispatch_routes, plot_route_efficiency), use_container_width=True, key="dispatch_route_efficiency")
 
                 # Download dispatch plan
-                dispatch_df = []
-                for route in dispatch_routes:
-                    for stop in route.get('route', []):
-                        product = stop.get('product', {})
-                        dispatch_df.append({
-                            'Vehicle': route.get('vehicle_id'),
-                            'Driver': route.get('driver_name'),
-                            'Product': product.get('Product'),
-                            'Weight': product.get('Weight'),
-                            'Priority': product.get('Priority'),
-                            'Delivery_Location': stop.get('location'),
-                            'Estimated_Arrival': stop.get('estimated_arrival'),
-                            'Distance': stop.get('distance_from_previous'),
-                            'Service_Time': stop.get('service_time')
-                        })
-                if dispatch_df:
-                    dispatch_output_df = pd.DataFrame(dispatch_df)
-                    dispatch_csv_buffer = io.StringIO()
-                    dispatch_output_df.to_csv(dispatch_csv_buffer, index=False)
+                dispatch_records = [
+                    (route.get('vehicle_id'), route.get('driver_name'),
+                     product.get('Product'), product.get('Weight'), product.get('Priority'),
+                     stop.get('location'), stop.get('estimated_arrival'),
+                     stop.get('distance_from_previous'), stop.get('service_time'))
+                    for route in dispatch_routes
+                    for stop in route.get('route', [])
+                    for product in (stop.get('product', {}),)
+                ]
+                if dispatch_records:
+                    dispatch_output_df = pd.DataFrame.from_records(dispatch_records, columns=[
+                        'Vehicle', 'Driver', 'Product', 'Weight', 'Priority',
+                        'Delivery_Location', 'Estimated_Arrival', 'Distance', 'Service_Time'
+                    ])
                     st.download_button(
                         label="Download Complete Dispatch Plan",
-                        data=dispatch_csv_buffer.getvalue(),
+                        data=dispatch_output_df.to_csv(index=False).encode('utf-8'),
                         file_name="complete_dispatch_plan.csv",
                         mime="text/csv"
                     )
@@ -355,20 +477,6 @@ with tab3:
     }
     st.markdown("**Live optimization with real-time goods movement tracking and continuous optimization**")
     
-    if products is not None:
-        # Add all products to dynamic optimizer state if not already present
-        if 'dynamic_products_loaded' not in st.session_state:
-            for idx, product in enumerate(products):
-                event = {
-                    'type': 'goods_in',
-                    'product': product,
-                    'location': product.get('Destination', 'Receiving')
-                }
-                dynamic_optimizer.add_event(event)
-            st.session_state['dynamic_products_loaded'] = True
-            st.success(f"Added {len(products)} products from CSV to dynamic optimization system.")
-        # force_rerun() removed so the rest of the tab displays
-    
     # Dynamic optimization controls
     col1, col2 = st.columns(2)
     with col1:
@@ -393,6 +501,8 @@ with tab3:
         st.metric("Available Products", status['available_products'])
     with col4:
         st.metric("Pending Events", status['pending_events'])
+    if status['background_optimization']:
+        st.info("⏳ Optimizing the uploaded products in the background; rerun to see storage and vehicle assignments.")
     
     # Simulate real-time events (manual add/remove, optional)
     st.subheader("🎮 Simulate Real-Time Events (Optional)")
@@ -465,14 +575,12 @@ with tab3:
                 "fragile_on_top": True,
                 "priority_first": True
             }
-            predictions = ai_trainer.predict_optimization_quality(products_for_ai, dynamic_constraints)
+            predictions = predict_quality(products_for_ai, dynamic_constraints)
             if 'error' not in predictions:
-                col1, col2, col3 = st.columns(3)
+                col1, col2 = st.columns(2)
                 with col1:
                     st.metric("Predicted Trucks Needed", predictions.get('predicted_trucks', 0))
                 with col2:
-                    st.metric("Optimization Confidence", f"{predictions.get('optimization_confidence', 0)*100:.1f}%")
-                with col3:
                     st.metric("AI Recommendations", len(predictions.get('recommendations', [])))
             else:
                 st.info("AI model is not trained. Please train the model for predictions.")
@@ -492,7 +600,7 @@ with tab4:
         st.subheader("📈 Performance Metrics")
         
         # Past jobs analysis
-        jobs = list_jobs()
+        jobs = _cached_job_summaries()
         if jobs:
             st.write("**Historical Optimization Performance**")
             
@@ -505,7 +613,7 @@ with tab4:
                         job_data.append({
                             'Job ID': job[0],
                             'Date': job[1],
-                            'Products': len(pd.read_csv(io.StringIO(job[2]))) if job[2] else 0,
+                            'Products': job[2] or 0,
                             'Constraints': json.loads(job[3]) if job[3] else {}
                         })
                     else:
@@ -562,7 +670,7 @@ with tab4:
             route_summary = st.session_state.get('route_summary', {})
         else:
             # Load from database
-            db_routes = get_latest_dispatch_routes()
+            db_routes = saved_dispatch_routes()
             if db_routes:
                 dispatch_routes = db_routes['route_data']
                 route_summary = db_routes['route_summary']
@@ -580,10 +688,11 @@ with tab4:
                 st.metric("Average Cost per Product", f"₹{route_summary.get('average_cost_per_product', 0) if route_summary else 0:.2f}")
             
             # Cost breakdown chart
-            st.plotly_chart(plot_cost_breakdown(dispatch_routes), use_container_width=True, key="analytics_cost_breakdown")
+            from dispatch_optimizer.visualizations.route_visualizer import plot_cost_breakdown, plot_route_efficiency
+            st.plotly_chart(route_figure(dispatch_routes, plot_cost_breakdown), use_container_width=True, key="analytics_cost_breakdown")
             
             # Route efficiency chart
-            st.plotly_chart(plot_route_efficiency(dispatch_routes), use_container_width=True, key="analytics_route_efficiency")
+            st.plotly_chart(route_figure(dispatch_routes, plot_route_efficiency), use_container_width=True, key="analytics_route_efficiency")
             
             # Detailed cost breakdown table
             st.subheader("📋 Detailed Cost Breakdown")
@@ -596,7 +705,7 @@ with tab4:
                     'Fuel Cost': f"₹{route.get('fuel_cost', 0):.2f}",
                     'Operating Cost': f"₹{route.get('operating_cost', 0):.2f}",
                     'Driver Cost': f"₹{route.get('driver_cost', 0):.2f}",
-                    'Distance': f"{route.get('total_distance', 0) * 1.60934:.1f} km",
+                    'Distance': f"{route.get('total_distance_km', 0):.1f} km",
                     'Products': route.get('products_delivered', 0)
                 })
             
@@ -617,7 +726,7 @@ with tab4:
             route_summary = st.session_state.get('route_summary', {})
         else:
             # Load from database
-            db_routes = get_latest_dispatch_routes()
+            db_routes = saved_dispatch_routes()
             if db_routes:
                 dispatch_routes = db_routes['route_data']
                 route_summary = db_routes['route_summary']
@@ -628,39 +737,44 @@ with tab4:
             with col1:
                 st.metric("Active Vehicles", len(dispatch_routes))
             with col2:
-                st.metric("Total Distance", f"{route_summary.get('total_distance', 0) * 1.60934 if route_summary else 0:.1f} km")
+                st.metric("Total Distance", f"{route_summary.get('total_distance', 0) if route_summary else 0:.1f} km")
             with col3:
                 st.metric("Total Products Delivered", route_summary.get('total_products', 0) if route_summary else 0)
             with col4:
                 st.metric("Average Products per Vehicle", f"{(route_summary.get('total_products', 0) if route_summary else 0) / max(len(dispatch_routes), 1):.1f}")
             
             # Vehicle utilization chart
-            st.plotly_chart(plot_vehicle_utilization(dispatch_routes), use_container_width=True, key="fleet_vehicle_utilization")
+            from dispatch_optimizer.visualizations.route_visualizer import (
+                plot_vehicle_utilization, plot_route_map, plot_delivery_heatmap
+            )
+            st.plotly_chart(route_figure(dispatch_routes, plot_vehicle_utilization), use_container_width=True, key="fleet_vehicle_utilization")
             
             # Route map
-            st.plotly_chart(plot_route_map(dispatch_routes), use_container_width=True, key="fleet_route_map")
+            st.plotly_chart(route_figure(dispatch_routes, plot_route_map), use_container_width=True, key="fleet_route_map")
             
             # Delivery heatmap
-            st.plotly_chart(plot_delivery_heatmap(dispatch_routes), use_container_width=True, key="fleet_delivery_heatmap")
+            st.plotly_chart(route_figure(dispatch_routes, plot_delivery_heatmap), use_container_width=True, key="fleet_delivery_heatmap")
             
             # Fleet performance table
             st.subheader("📊 Fleet Performance Details")
-            fleet_data = []
-            for route in dispatch_routes:
-                fleet_data.append({
-                    'Vehicle': route.get('vehicle_id'),
-                    'Driver': route.get('driver_name'),
-                    'Distance': f"{route.get('total_distance', 0) * 1.60934:.1f} km",
-                    'Duration': f"{route.get('estimated_duration', 0):.1f} hours",
-                    'Products': route.get('products_delivered', 0),
-                    'Weight': f"{route.get('total_weight', 0):.1f} lbs",
-                    'Volume': f"{route.get('total_volume', 0):.1f} ft³",
-                    'Cost': f"₹{route.get('total_cost', 0):.2f}",
-                    'Efficiency': f"₹{route.get('total_cost', 0) / max(route.get('total_distance', 1) * 1.60934, 1):.2f}/km"
-                })
+            # Built column-wise from the routes; values stay numeric and are formatted by the grid
+            fleet_df = pd.DataFrame.from_records(dispatch_routes, columns=[
+                'vehicle_id', 'driver_name', 'total_distance_km', 'estimated_duration',
+                'products_delivered', 'total_weight', 'total_volume', 'total_cost'
+            ])
+            fleet_df.iloc[:, 2:] = fleet_df.iloc[:, 2:].fillna(0)
+            fleet_df['efficiency'] = fleet_df['total_cost'] / fleet_df['total_distance_km'].clip(lower=1)
+            fleet_df.columns = ['Vehicle', 'Driver', 'Distance', 'Duration', 'Products', 'Weight', 'Volume', 'Cost', 'Efficiency']
             
-            if fleet_data:
-                st.dataframe(pd.DataFrame(fleet_data))
+            if not fleet_df.empty:
+                st.dataframe(fleet_df, column_config={
+                    'Distance': st.column_config.NumberColumn(format="%.1f km"),
+                    'Duration': st.column_config.NumberColumn(format="%.1f hours"),
+                    'Weight': st.column_config.NumberColumn(format="%.1f lbs"),
+                    'Volume': st.column_config.NumberColumn(format="%.1f ft³"),
+                    'Cost': st.column_config.NumberColumn(format="₹%.2f"),
+                    'Efficiency': st.column_config.NumberColumn(format="₹%.2f/km"),
+                })
         else:
             st.info("💡 Run dispatch planning first to see fleet analytics data")
 
@@ -685,22 +799,20 @@ with tab5:
             st.warning("Default drivers are no longer created automatically.")
     # Past jobs section
     st.subheader("📋 Past Optimization Jobs")
-    jobs = list_jobs()
+    job_pages = max(1, -(-len(_cached_job_summaries()) // JOBS_PAGE_SIZE))
+    job_page = st.number_input("Page", min_value=1, max_value=job_pages, value=1, key="past_jobs_page") if job_pages > 1 else 1
+    jobs = _cached_jobs(int(job_page))
     if jobs:
         try:
             selected_job = st.selectbox("Select a past job:", [f"Job {j[0]} - {j[1]}" for j in jobs if len(j) >= 2])
             if selected_job:
                 job_id = int(selected_job.split()[1])
-                job_data = get_job_by_id(job_id)
-                if job_data and len(job_data) >= 3:
-                    st.write(f"**Job Date:** {job_data[1]}")
-                    try:
-                        products_count = len(pd.read_csv(io.StringIO(job_data[2]))) if job_data[2] else 0
-                        st.write(f"**Products:** {products_count} items")
-                    except Exception as e:
-                        st.write(f"**Products:** Unable to parse data")
+                job_summary = get_job_summary(job_id)
+                if job_summary:
+                    st.write(f"**Job Date:** {job_summary[1]}")
+                    st.write(f"**Products:** {job_summary[2] or 0} items")
                     if st.button("Load Job Data"):
-                        st.session_state['loaded_job'] = job_data
+                        st.session_state['loaded_job'] = get_job_by_id(job_id)
                         st.success("Job data loaded into session!")
                 else:
                     st.warning("Job data is incomplete or corrupted")
@@ -710,23 +822,44 @@ with tab5:
     st.subheader("🚚 Fleet & Driver Management (Persistent)")
     st.markdown("**Manage your fleet and drivers. All changes are saved and reloaded automatically.**")
     
-    # Vehicles
-    st.write("### Vehicles (Trucks)")
-    vehicles = list_vehicles()
-    for i, vehicle in enumerate(vehicles):
-        col1, col2, col3, col4 = st.columns([2,2,2,2])
-        with col1:
-            st.write(f"**ID:** {vehicle['id']}")
-        with col2:
-            st.write(f"**Capacity:** {vehicle['capacity_weight']} kg, {vehicle['capacity_volume']} ft³")
-        with col3:
-            st.write(f"**Available:** {'Yes' if vehicle.get('available', True) else 'No'}")
-        with col4:
-            if st.button("Edit", key=f"edit_vehicle_{i}"):
-                st.session_state['edit_vehicle'] = vehicle
-            if st.button("Delete", key=f"delete_vehicle_{i}"):
-                delete_vehicle(vehicle['id'])
-                force_rerun()
+    # Vehicles; list and add form rerun on their own, without the rest of the app
+    @st.fragment
+    def vehicles_panel():
+        st.write("### Vehicles (Trucks)")
+        vehicles = _cached_vehicles()
+        # One table for the whole fleet; Edit/Delete are drawn once, for the selected row
+        selection = st.dataframe(
+            pd.DataFrame({
+                'ID': [vehicle['id'] for vehicle in vehicles],
+                'Capacity': [f"{vehicle['capacity_weight']} kg, {vehicle['capacity_volume']} ft³" for vehicle in vehicles],
+                'Available': ['Yes' if vehicle.get('available', True) else 'No' for vehicle in vehicles],
+            }),
+            hide_index=True, on_select="rerun", selection_mode="single-row",
+            key=f"vehicles_table_{st.session_state.get('vehicles_table_version', 0)}"
+        )
+        selected_rows = [i for i in selection.selection.rows if i < len(vehicles)]
+        if selected_rows:
+            vehicle = vehicles[selected_rows[0]]
+            col1, col2 = st.columns(2)
+            with col1:
+                if st.button(f"Edit {vehicle['id']}", key="edit_vehicle_selected"):
+                    st.session_state['edit_vehicle'] = vehicle
+                    # The edit form lives in the sidebar, outside this fragment
+                    st.rerun()
+            with col2:
+                # Callbacks run before the fragment reruns, so the table below is already up to date
+                st.button(f"Delete {vehicle['id']}", key="delete_vehicle_selected", on_click=remove_vehicle, args=(vehicle['id'],))
+        
+        with st.expander("Add New Vehicle/Truck"):
+            st.text_input("Truck ID", key="add_vehicle_id")
+            st.number_input("Capacity Weight (kg)", min_value=1, value=2000, key="add_vehicle_weight")
+            st.number_input("Capacity Volume (ft³)", min_value=1, value=800, key="add_vehicle_volume")
+            st.number_input("Fuel Efficiency (km/l)", min_value=1.0, value=8.5, key="add_vehicle_eff")
+            st.number_input("Operating Cost per km (₹)", min_value=1.0, value=15.0, key="add_vehicle_cost")
+            st.checkbox("Available", value=True, key="add_vehicle_avail")
+            st.button("Add Truck", key="add_vehicle_btn", on_click=save_new_vehicle)
+    
+    vehicles_panel()
     
     # Edit Vehicle Modal
     if 'edit_vehicle' in st.session_state:
@@ -747,48 +880,48 @@ with tab5:
                 'operating_cost_per_km': new_cost,
                 'available': new_avail
             })
+            _cached_vehicles.clear()
             del st.session_state['edit_vehicle']
             force_rerun()
         if st.sidebar.button("Cancel", key="cancel_vehicle_edit"):
             del st.session_state['edit_vehicle']
             force_rerun()
     
-    with st.expander("Add New Vehicle/Truck"):
-        new_vehicle_id = st.text_input("Truck ID", key="add_vehicle_id")
-        new_vehicle_weight = st.number_input("Capacity Weight (kg)", min_value=1, value=2000, key="add_vehicle_weight")
-        new_vehicle_volume = st.number_input("Capacity Volume (ft³)", min_value=1, value=800, key="add_vehicle_volume")
-        new_vehicle_eff = st.number_input("Fuel Efficiency (km/l)", min_value=1.0, value=8.5, key="add_vehicle_eff")
-        new_vehicle_cost = st.number_input("Operating Cost per km (₹)", min_value=1.0, value=15.0, key="add_vehicle_cost")
-        new_vehicle_avail = st.checkbox("Available", value=True, key="add_vehicle_avail")
-        if st.button("Add Truck", key="add_vehicle_btn"):
-            add_vehicle({
-                'id': new_vehicle_id,
-                'capacity_weight': new_vehicle_weight,
-                'capacity_volume': new_vehicle_volume,
-                'fuel_efficiency': new_vehicle_eff,
-                'operating_cost_per_km': new_vehicle_cost,
-                'available': new_vehicle_avail
-            })
-            st.success(f"Truck {new_vehicle_id} added!")
-            force_rerun()
+    # Drivers; list and add form rerun on their own, without the rest of the app
+    @st.fragment
+    def drivers_panel():
+        st.write("### Drivers")
+        drivers = _cached_drivers()
+        selection = st.dataframe(
+            pd.DataFrame({
+                'ID': [driver['id'] for driver in drivers],
+                'Name': [driver['name'] for driver in drivers],
+                'Available': ['Yes' if driver.get('available', True) else 'No' for driver in drivers],
+            }),
+            hide_index=True, on_select="rerun", selection_mode="single-row",
+            key=f"drivers_table_{st.session_state.get('drivers_table_version', 0)}"
+        )
+        selected_rows = [i for i in selection.selection.rows if i < len(drivers)]
+        if selected_rows:
+            driver = drivers[selected_rows[0]]
+            col1, col2 = st.columns(2)
+            with col1:
+                if st.button(f"Edit {driver['id']}", key="edit_driver_selected"):
+                    st.session_state['edit_driver'] = driver
+                    # The edit form lives in the sidebar, outside this fragment
+                    st.rerun()
+            with col2:
+                st.button(f"Delete {driver['id']}", key="delete_driver_selected", on_click=remove_driver, args=(driver['id'],))
+        
+        with st.expander("Add New Driver"):
+            st.text_input("Driver ID", key="add_driver_id")
+            st.text_input("Driver Name", key="add_driver_name")
+            st.number_input("Max Hours", min_value=1.0, value=8.0, key="add_driver_hours")
+            st.number_input("Hourly Rate (₹)", min_value=1.0, value=300.0, key="add_driver_rate")
+            st.checkbox("Available", value=True, key="add_driver_avail")
+            st.button("Add Driver", key="add_driver_btn", on_click=save_new_driver)
     
-    # Drivers
-    st.write("### Drivers")
-    drivers = list_drivers()
-    for i, driver in enumerate(drivers):
-        col1, col2, col3, col4 = st.columns([2,2,2,2])
-        with col1:
-            st.write(f"**ID:** {driver['id']}")
-        with col2:
-            st.write(f"**Name:** {driver['name']}")
-        with col3:
-            st.write(f"**Available:** {'Yes' if driver.get('available', True) else 'No'}")
-        with col4:
-            if st.button("Edit", key=f"edit_driver_{i}"):
-                st.session_state['edit_driver'] = driver
-            if st.button("Delete", key=f"delete_driver_{i}"):
-                delete_driver(driver['id'])
-                force_rerun()
+    drivers_panel()
     
     # Edit Driver Modal
     if 'edit_driver' in st.session_state:
@@ -807,28 +940,12 @@ with tab5:
                 'hourly_rate': new_rate,
                 'available': new_avail
             })
+            _cached_drivers.clear()
             del st.session_state['edit_driver']
             force_rerun()
         if st.sidebar.button("Cancel", key="cancel_driver_edit"):
             del st.session_state['edit_driver']
             force_rerun()
-    
-    with st.expander("Add New Driver"):
-        new_driver_id = st.text_input("Driver ID", key="add_driver_id")
-        new_driver_name = st.text_input("Driver Name", key="add_driver_name")
-        new_driver_hours = st.number_input("Max Hours", min_value=1.0, value=8.0, key="add_driver_hours")
-        new_driver_rate = st.number_input("Hourly Rate (₹)", min_value=1.0, value=300.0, key="add_driver_rate")
-        new_driver_avail = st.checkbox("Available", value=True, key="add_driver_avail")
-        if st.button("Add Driver", key="add_driver_btn"):
-            add_driver({
-                'id': new_driver_id,
-                'name': new_driver_name,
-                'max_hours': new_driver_hours,
-                'hourly_rate': new_driver_rate,
-                'available': new_driver_avail
-            })
-            st.success(f"Driver {new_driver_name} added!")
-            force_rerun()
 
 # Footer
 st.markdown("---")
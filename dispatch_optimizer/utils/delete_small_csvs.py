@@ -1,19 +1,34 @@
 import os
-import pandas as pd
 
 data_dir = os.path.join(os.path.dirname(__file__), '..', 'data')
 threshold = 50
 deleted = 0
 
+def count_rows(path):
+    """
+    Data rows in a CSV file, counted from its non-blank lines without parsing any fields.
+    Unlike parsing the file, a quoted field spanning several lines counts once per line
+    and malformed files are counted rather than treated as empty, so they are kept once
+    they reach the threshold.
+    """
+    lines = 0
+    with open(path, 'rb') as f:
+        for line in f:
+            # Blank lines, including trailing ones, are not rows
+            if line.strip():
+                lines += 1
+    # The first non-blank line is the header
+    return max(lines - 1, 0)
+
 for fname in os.listdir(data_dir):
     fpath = os.path.join(data_dir, fname)
     if fname.endswith('.csv'):
         try:
-            n = len(pd.read_csv(fpath))
+            n = count_rows(fpath)
         except Exception as e:
             n = 0
         if n < threshold:
             os.remove(fpath)
             deleted += 1
             print(f'Deleted {fname} with {n} rows')
-print(f'Total deleted: {deleted}') 
\ No newline at end of file
+print(f'Total deleted: {deleted}')
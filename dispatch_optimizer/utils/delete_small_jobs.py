@@ -1,22 +1,12 @@
-from dispatch_optimizer.utils.job_db import list_jobs, get_job_by_id, delete_job_by_id
-import pandas as pd
-import io
+from dispatch_optimizer.utils.job_db import list_job_summaries, delete_jobs_by_ids
 
 def main():
-    jobs = list_jobs()
-    deleted = 0
-    for j in jobs:
-        job = get_job_by_id(j[0])
-        if job and job[2]:
-            try:
-                n = len(pd.read_csv(io.StringIO(job[2])))
-            except Exception as e:
-                n = 0
-            if n < 50:
-                delete_job_by_id(j[0])
-                deleted += 1
-                print(f'Deleted job {j[0]} with {n} products')
-    print(f'Total deleted: {deleted}')
+    # Product counts come from SQLite, so no stored CSV is loaded or parsed
+    small_jobs = [(job_id, n) for job_id, _, n, _ in list_job_summaries() if n is not None and n < 50]
+    delete_jobs_by_ids(job_id for job_id, _ in small_jobs)
+    for job_id, n in small_jobs:
+        print(f'Deleted job {job_id} with {n} products')
+    print(f'Total deleted: {len(small_jobs)}')
 
 if __name__ == '__main__':
-    main() 
\ No newline at end of file
+    main()
@@ -10,7 +10,6 @@ def generate_id(prefix, number):
         prefix (str): Prefix for the ID.
         number (int): Number to append.
     Returns:
-        str: Generated ID.
+        str: Generated ID, with the number zero-padded to six digits.
     """
-    # TODO: Implement ID generation logic
-    pass 
\ No newline at end of file
+    return f"{prefix}{number:06d}" 
\ No newline at end of file
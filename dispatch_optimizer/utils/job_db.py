@@ -5,12 +5,70 @@ Utility for storing and retrieving optimization jobs in SQLite.
 
 import sqlite3
 import json
+import threading
+import zlib
+from contextlib import contextmanager
 from datetime import datetime
 import os
 
+# orjson (de)serialises the large route payloads several times faster than the json module;
+# fall back to json when it is not installed
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
 DB_PATH = os.path.join(os.path.dirname(__file__), '..', 'outputs', 'jobs.db')
 DB_PATH = os.path.abspath(DB_PATH)
 
+# zlib level for the dispatch_routes payloads; JSON route data shrinks ~5x for a few ms of CPU
+PAYLOAD_COMPRESSION_LEVEL = 3
+
+# Non-blank lines after the CSV header, counted by a function registered on the connection
+# so input_csv is never returned to the caller
+PRODUCT_COUNT_SQL = "csv_row_count(input_csv)"
+
+# Ids bound per IN (...) query; stays under SQLite's default limit of 999 host parameters
+BULK_QUERY_MAX_IDS = 900
+
+# One connection per process, shared by every helper below instead of reconnecting per call
+_conn = None
+_conn_lock = threading.Lock()
+
+# Applied when the connection opens. WAL lets readers run alongside a writer and, with
+# synchronous=NORMAL, commits skip an fsync; mmap serves hot pages without read() calls.
+CONNECTION_PRAGMAS = (
+    "PRAGMA journal_mode=WAL",
+    "PRAGMA synchronous=NORMAL",
+    "PRAGMA mmap_size=268435456",
+    "PRAGMA temp_store=MEMORY",
+    "PRAGMA cache_size=-65536",
+)
+
+def _csv_row_count(input_csv):
+    """Data rows in CSV text, skipping blank lines like delete_small_csvs.count_rows; None when empty."""
+    if not input_csv:
+        return None
+    lines = sum(1 for line in input_csv.split('\n') if line.strip())
+    # The first non-blank line is the header
+    return max(lines - 1, 0)
+
+@contextmanager
+def _connection():
+    """Shared connection to DB_PATH, opened on first use; callers are serialised by a lock."""
+    global _conn
+    with _conn_lock:
+        if _conn is None:
+            _conn = sqlite3.connect(DB_PATH, check_same_thread=False)
+            for pragma in CONNECTION_PRAGMAS:
+                _conn.execute(pragma)
+            _conn.create_function('csv_row_count', 1, _csv_row_count, deterministic=True)
+        try:
+            yield _conn
+        except Exception:
+            _conn.rollback()
+            raise
+
 class DateTimeEncoder(json.JSONEncoder):
     """Custom JSON encoder that handles datetime objects."""
     def default(self, obj):
@@ -18,173 +76,256 @@ class DateTimeEncoder(json.JSONEncoder):
             return obj.isoformat()
         return super().default(obj)
 
+def _orjson_default(obj):
+    """Encode datetime subclasses (e.g. pandas Timestamps) that orjson does not handle natively."""
+    if isinstance(obj, datetime):
+        return obj.isoformat()
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
 def serialize_for_db(obj):
     """Serialize object to JSON string, handling datetime objects."""
+    if orjson is not None:
+        return orjson.dumps(obj, default=_orjson_default,
+                            option=orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS).decode()
     return json.dumps(obj, cls=DateTimeEncoder)
 
+def deserialize_from_db(data):
+    """Parse JSON written by serialize_for_db, either as text or as a compressed payload BLOB."""
+    if isinstance(data, bytes):
+        data = zlib.decompress(data)
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+def _compress_payload(obj):
+    """Serialized, zlib-compressed BLOB for a dispatch_routes payload column."""
+    return sqlite3.Binary(zlib.compress(serialize_for_db(obj).encode('utf-8'), PAYLOAD_COMPRESSION_LEVEL))
+
 def init_db():
     """Initialize the SQLite database."""
-    conn = sqlite3.connect(DB_PATH)
-    c = conn.cursor()
-    c.execute('''CREATE TABLE IF NOT EXISTS jobs (
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
-        timestamp TEXT,
-        input_csv TEXT,
-        constraints TEXT,
-        output_csv TEXT
-    )''')
-    
-    # Add dispatch routes table
-    c.execute('''CREATE TABLE IF NOT EXISTS dispatch_routes
-                 (id INTEGER PRIMARY KEY AUTOINCREMENT,
-                  timestamp TEXT,
-                  route_data TEXT,
-                  route_summary TEXT,
-                  products_data TEXT)''')
-    
-    conn.commit()
-    conn.close()
+    with _connection() as conn:
+        c = conn.cursor()
+        c.execute('''CREATE TABLE IF NOT EXISTS jobs (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            timestamp TEXT,
+            input_csv TEXT,
+            constraints TEXT,
+            output_csv TEXT
+        )''')
+        
+        # Add dispatch routes table
+        c.execute('''CREATE TABLE IF NOT EXISTS dispatch_routes
+                     (id INTEGER PRIMARY KEY AUTOINCREMENT,
+                      timestamp TEXT,
+                      route_data TEXT,
+                      route_summary TEXT,
+                      products_data TEXT)''')
+        
+        conn.commit()
 
 def save_job(input_csv, constraints, output_csv):
-    conn = sqlite3.connect(DB_PATH)
-    c = conn.cursor()
-    c.execute("INSERT INTO jobs (timestamp, input_csv, constraints, output_csv) VALUES (?, ?, ?, ?)",
-              (datetime.now().isoformat(), input_csv, json.dumps(constraints), output_csv))
-    conn.commit()
-    conn.close()
-
-def list_jobs():
-    conn = sqlite3.connect(DB_PATH)
-    c = conn.cursor()
-    c.execute("SELECT id, timestamp FROM jobs ORDER BY id DESC")
-    jobs = c.fetchall()
-    conn.close()
+    with _connection() as conn:
+        c = conn.cursor()
+        c.execute("INSERT INTO jobs (timestamp, input_csv, constraints, output_csv) VALUES (?, ?, ?, ?)",
+                  (datetime.now().isoformat(), input_csv, json.dumps(constraints), output_csv))
+        conn.commit()
+
+def list_jobs(limit=None, offset=0):
+    """
+    List (id, timestamp) of jobs, newest first.
+    Args:
+        limit (int, optional): Most jobs to return; all when None.
+        offset (int): Number of newest jobs to skip.
+    Returns:
+        list of tuple: Job rows.
+    """
+    with _connection() as conn:
+        c = conn.cursor()
+        # id is the rowid, so the descending order is a reverse table walk with no sort
+        c.execute("SELECT id, timestamp FROM jobs ORDER BY id DESC LIMIT ? OFFSET ?",
+                  (-1 if limit is None else limit, offset))
+        jobs = c.fetchall()
+    return jobs
+
+def list_job_summaries():
+    """List jobs with their product counts, without returning the stored CSVs.
+    
+    The count is the number of non-blank lines after the header, taken by
+    a function called from the query so the input_csv blobs are never
+    fetched; it is None for jobs stored without input data.
+    """
+    with _connection() as conn:
+        c = conn.cursor()
+        c.execute(f"SELECT id, timestamp, {PRODUCT_COUNT_SQL}, constraints FROM jobs ORDER BY id DESC")
+        jobs = c.fetchall()
     return jobs
 
+def get_job_summary(job_id):
+    """Like list_job_summaries, for a single job; None when it does not exist."""
+    with _connection() as conn:
+        c = conn.cursor()
+        c.execute(f"SELECT id, timestamp, {PRODUCT_COUNT_SQL}, constraints FROM jobs WHERE id=?", (job_id,))
+        job = c.fetchone()
+    return job
+
 def get_job_by_id(job_id):
-    conn = sqlite3.connect(DB_PATH)
-    c = conn.cursor()
-    c.execute("SELECT id, timestamp, input_csv, constraints, output_csv FROM jobs WHERE id=?", (job_id,))
-    job = c.fetchone()
-    conn.close()
+    with _connection() as conn:
+        c = conn.cursor()
+        c.execute("SELECT id, timestamp, input_csv, constraints, output_csv FROM jobs WHERE id=?", (job_id,))
+        job = c.fetchone()
     return job
 
+def get_jobs_bulk(job_ids):
+    """Fetch several full job rows, BULK_QUERY_MAX_IDS ids per query, newest first."""
+    job_ids = list(dict.fromkeys(job_ids))
+    if not job_ids:
+        return []
+    jobs = []
+    with _connection() as conn:
+        c = conn.cursor()
+        for start in range(0, len(job_ids), BULK_QUERY_MAX_IDS):
+            chunk = job_ids[start:start + BULK_QUERY_MAX_IDS]
+            c.execute(f"SELECT id, timestamp, input_csv, constraints, output_csv FROM jobs WHERE id IN ({','.join('?' * len(chunk))})",
+                      chunk)
+            jobs.extend(c.fetchall())
+    jobs.sort(key=lambda job: job[0], reverse=True)
+    return jobs
+
 def save_dispatch_routes(dispatch_routes, route_summary, products):
     """Save dispatch routes data to database."""
-    conn = sqlite3.connect(DB_PATH)
-    c = conn.cursor()
     timestamp = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-    
-    c.execute("INSERT INTO dispatch_routes (timestamp, route_data, route_summary, products_data) VALUES (?, ?, ?, ?)",
-              (timestamp, serialize_for_db(dispatch_routes), serialize_for_db(route_summary), serialize_for_db(products)))
-    
-    conn.commit()
-    conn.close()
+    # Encode outside the connection lock so other callers are not held up
+    payloads = (_compress_payload(dispatch_routes), _compress_payload(route_summary), _compress_payload(products))
+    with _connection() as conn:
+        c = conn.cursor()
+        c.execute("INSERT INTO dispatch_routes (timestamp, route_data, route_summary, products_data) VALUES (?, ?, ?, ?)",
+                  (timestamp, *payloads))
+        conn.commit()
     return c.lastrowid
 
+def get_latest_dispatch_routes_id():
+    """Id of the latest saved dispatch routes row, or None when there are none."""
+    with _connection() as conn:
+        c = conn.cursor()
+        c.execute("SELECT max(id) FROM dispatch_routes")
+        latest_id = c.fetchone()[0]
+    return latest_id
+
 def get_latest_dispatch_routes():
     """Get the latest dispatch routes data."""
-    conn = sqlite3.connect(DB_PATH)
-    c = conn.cursor()
-    c.execute("SELECT * FROM dispatch_routes ORDER BY id DESC LIMIT 1")
-    result = c.fetchone()
-    conn.close()
+    with _connection() as conn:
+        c = conn.cursor()
+        c.execute("SELECT * FROM dispatch_routes ORDER BY id DESC LIMIT 1")
+        result = c.fetchone()
     
     if result:
         try:
             return {
                 'id': result[0],
                 'timestamp': result[1],
-                'route_data': json.loads(result[2]) if result[2] else [],
-                'route_summary': json.loads(result[3]) if result[3] else {},
-                'products_data': json.loads(result[4]) if result[4] else []
+                'route_data': deserialize_from_db(result[2]) if result[2] else [],
+                'route_summary': deserialize_from_db(result[3]) if result[3] else {},
+                'products_data': deserialize_from_db(result[4]) if result[4] else []
             }
-        except json.JSONDecodeError as e:
+        except (json.JSONDecodeError, zlib.error) as e:
             print(f"Warning: Could not decode dispatch routes data: {e}")
             return None
     return None
 
 def delete_job_by_id(job_id):
-    conn = sqlite3.connect(DB_PATH)
-    c = conn.cursor()
-    c.execute("DELETE FROM jobs WHERE id=?", (job_id,))
-    conn.commit()
-    conn.close()
+    with _connection() as conn:
+        c = conn.cursor()
+        c.execute("DELETE FROM jobs WHERE id=?", (job_id,))
+        conn.commit()
+
+def delete_jobs_by_ids(job_ids):
+    """Delete several jobs in one transaction, BULK_QUERY_MAX_IDS ids per statement."""
+    job_ids = list(job_ids)
+    if not job_ids:
+        return
+    with _connection() as conn:
+        c = conn.cursor()
+        for start in range(0, len(job_ids), BULK_QUERY_MAX_IDS):
+            chunk = job_ids[start:start + BULK_QUERY_MAX_IDS]
+            c.execute(f"DELETE FROM jobs WHERE id IN ({','.join('?' * len(chunk))})", chunk)
+        conn.commit()
 
 def init_drivers_vehicles_tables():
-    conn = sqlite3.connect(DB_PATH)
-    c = conn.cursor()
-    c.execute('''CREATE TABLE IF NOT EXISTS drivers (
-        id TEXT PRIMARY KEY,
-        name TEXT,
-        max_hours REAL,
-        hourly_rate REAL,
-        available INTEGER
-    )''')
-    c.execute('''CREATE TABLE IF NOT EXISTS vehicles (
-        id TEXT PRIMARY KEY,
-        capacity_weight REAL,
-        capacity_volume REAL,
-        fuel_efficiency REAL,
-        operating_cost_per_km REAL,
-        available INTEGER
-    )''')
-    conn.commit()
-    conn.close()
+    with _connection() as conn:
+        c = conn.cursor()
+        c.execute('''CREATE TABLE IF NOT EXISTS drivers (
+            id TEXT PRIMARY KEY,
+            name TEXT,
+            max_hours REAL,
+            hourly_rate REAL,
+            available INTEGER
+        )''')
+        c.execute('''CREATE TABLE IF NOT EXISTS vehicles (
+            id TEXT PRIMARY KEY,
+            capacity_weight REAL,
+            capacity_volume REAL,
+            fuel_efficiency REAL,
+            operating_cost_per_km REAL,
+            available INTEGER
+        )''')
+        conn.commit()
+
+def add_drivers(drivers):
+    """Insert or replace several drivers in one transaction."""
+    rows = [(d['id'], d['name'], d['max_hours'], d['hourly_rate'], int(d.get('available', True))) for d in drivers]
+    with _connection() as conn:
+        c = conn.cursor()
+        c.executemany("REPLACE INTO drivers (id, name, max_hours, hourly_rate, available) VALUES (?, ?, ?, ?, ?)", rows)
+        conn.commit()
 
 def add_driver(driver):
-    conn = sqlite3.connect(DB_PATH)
-    c = conn.cursor()
-    c.execute("REPLACE INTO drivers (id, name, max_hours, hourly_rate, available) VALUES (?, ?, ?, ?, ?)",
-              (driver['id'], driver['name'], driver['max_hours'], driver['hourly_rate'], int(driver.get('available', True))))
-    conn.commit()
-    conn.close()
+    add_drivers([driver])
 
 def update_driver(driver):
     add_driver(driver)
 
 def delete_driver(driver_id):
-    conn = sqlite3.connect(DB_PATH)
-    c = conn.cursor()
-    c.execute("DELETE FROM drivers WHERE id=?", (driver_id,))
-    conn.commit()
-    conn.close()
+    with _connection() as conn:
+        c = conn.cursor()
+        c.execute("DELETE FROM drivers WHERE id=?", (driver_id,))
+        conn.commit()
 
 def list_drivers():
-    conn = sqlite3.connect(DB_PATH)
-    c = conn.cursor()
-    c.execute("SELECT id, name, max_hours, hourly_rate, available FROM drivers")
-    rows = c.fetchall()
-    conn.close()
+    with _connection() as conn:
+        c = conn.cursor()
+        c.execute("SELECT id, name, max_hours, hourly_rate, available FROM drivers")
+        rows = c.fetchall()
     return [
         {'id': r[0], 'name': r[1], 'max_hours': r[2], 'hourly_rate': r[3], 'available': bool(r[4])}
         for r in rows
     ]
 
+def add_vehicles(vehicles):
+    """Insert or replace several vehicles in one transaction."""
+    rows = [(v['id'], v['capacity_weight'], v['capacity_volume'], v['fuel_efficiency'], v['operating_cost_per_km'], int(v.get('available', True)))
+            for v in vehicles]
+    with _connection() as conn:
+        c = conn.cursor()
+        c.executemany("REPLACE INTO vehicles (id, capacity_weight, capacity_volume, fuel_efficiency, operating_cost_per_km, available) VALUES (?, ?, ?, ?, ?, ?)", rows)
+        conn.commit()
+
 def add_vehicle(vehicle):
-    conn = sqlite3.connect(DB_PATH)
-    c = conn.cursor()
-    c.execute("REPLACE INTO vehicles (id, capacity_weight, capacity_volume, fuel_efficiency, operating_cost_per_km, available) VALUES (?, ?, ?, ?, ?, ?)",
-              (vehicle['id'], vehicle['capacity_weight'], vehicle['capacity_volume'], vehicle['fuel_efficiency'], vehicle['operating_cost_per_km'], int(vehicle.get('available', True))))
-    conn.commit()
-    conn.close()
+    add_vehicles([vehicle])
 
 def update_vehicle(vehicle):
     add_vehicle(vehicle)
 
 def delete_vehicle(vehicle_id):
-    conn = sqlite3.connect(DB_PATH)
-    c = conn.cursor()
-    c.execute("DELETE FROM vehicles WHERE id=?", (vehicle_id,))
-    conn.commit()
-    conn.close()
+    with _connection() as conn:
+        c = conn.cursor()
+        c.execute("DELETE FROM vehicles WHERE id=?", (vehicle_id,))
+        conn.commit()
 
 def list_vehicles():
-    conn = sqlite3.connect(DB_PATH)
-    c = conn.cursor()
-    c.execute("SELECT id, capacity_weight, capacity_volume, fuel_efficiency, operating_cost_per_km, available FROM vehicles")
-    rows = c.fetchall()
-    conn.close()
+    with _connection() as conn:
+        c = conn.cursor()
+        c.execute("SELECT id, capacity_weight, capacity_volume, fuel_efficiency, operating_cost_per_km, available FROM vehicles")
+        rows = c.fetchall()
     return [
         {'id': r[0], 'capacity_weight': r[1], 'capacity_volume': r[2], 'fuel_efficiency': r[3], 'operating_cost_per_km': r[4], 'available': bool(r[5])}
         for r in rows
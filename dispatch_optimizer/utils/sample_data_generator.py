@@ -3,79 +3,104 @@ sample_data_generator.py
 Generates sample product data for training the AI model with various warehouse storage scenarios.
 """
 
+import os
+import numpy as np
 import pandas as pd
-import random
 import json
-from datetime import datetime, timedelta
 
-def generate_product_variations(base_product, variations=100):
+# pyarrow's CSV writer is faster than DataFrame.to_csv; fall back to pandas when it is not installed
+try:
+    import pyarrow as pa
+    import pyarrow.csv as pa_csv
+except ImportError:
+    pa = None
+
+# Storage locations products are spread across
+WAREHOUSE_ZONES = (
+    "ZoneA", "ZoneB", "ZoneC", "ZoneD", "ZoneE", "ZoneF", "ZoneG", "ZoneH", "ZoneI", "ZoneJ",
+    "Rack1", "Rack2", "Rack3", "Rack4", "Rack5", "Rack6", "Rack7", "Rack8", "Rack9", "Rack10",
+    "Aisle1", "Aisle2", "Aisle3", "Aisle4", "Aisle5", "Aisle6", "Aisle7", "Aisle8", "Aisle9", "Aisle10",
+    "SectionA", "SectionB", "SectionC", "SectionD", "SectionE", "SectionF", "SectionG", "SectionH",
+    "Floor1", "Floor2", "Floor3", "Floor4", "Floor5",
+    "ColdStorage", "DryStorage", "HazardousStorage", "BulkStorage", "SmallItemStorage",
+    "PalletArea1", "PalletArea2", "PalletArea3", "PalletArea4", "PalletArea5",
+    "ShelfArea1", "ShelfArea2", "ShelfArea3", "ShelfArea4", "ShelfArea5",
+    "LoadingDock1", "LoadingDock2", "LoadingDock3", "LoadingDock4", "LoadingDock5",
+    "ReceivingArea", "ShippingArea", "QualityControl", "ReturnsArea", "OverflowStorage",
+    "Mezzanine1", "Mezzanine2", "Mezzanine3", "Mezzanine4", "Mezzanine5",
+    "Basement1", "Basement2", "Basement3", "Basement4", "Basement5",
+    "HighBay1", "HighBay2", "HighBay3", "HighBay4", "HighBay5",
+    "AutomatedStorage1", "AutomatedStorage2", "AutomatedStorage3", "AutomatedStorage4", "AutomatedStorage5",
+    "ManualStorage1", "ManualStorage2", "ManualStorage3", "ManualStorage4", "ManualStorage5",
+    "FastMoving", "SlowMoving", "Seasonal", "BulkItems", "FragileItems",
+    "HeavyItems", "LightItems", "LargeItems", "SmallItems", "MediumItems",
+    "Priority1", "Priority2", "Priority3", "Priority4", "Priority5",
+    "ExpressLane", "StandardLane", "EconomyLane", "PremiumLane", "OverflowLane"
+)
+
+# Compact column types for generated data: one decimal of precision fits float32, and the
+# small sets of priorities and zones are stored as categorical codes
+FLOAT_COLUMNS = ('Weight', 'Length', 'Width', 'Height')
+PRIORITY_DTYPE = pd.CategoricalDtype(['High', 'Medium', 'Low'])
+ZONE_DTYPE = pd.CategoricalDtype(WAREHOUSE_ZONES)
+
+# Scenario name characters replaced when building file names
+FILENAME_CHARS = str.maketrans({' ': '_', '&': 'and'})
+
+def _scenario_frame(columns):
+    """Build a generated scenario's DataFrame from its columns, in the compact types above."""
+    return pd.DataFrame({
+        **columns,
+        **{column: np.asarray(columns[column], dtype=np.float32) for column in FLOAT_COLUMNS},
+        'Fragile': np.asarray(columns['Fragile'], dtype=bool),
+        'Destination': pd.Categorical(columns['Destination'], dtype=ZONE_DTYPE),
+        'Priority': pd.Categorical(columns['Priority'], dtype=PRIORITY_DTYPE)
+    })
+
+def generate_product_variations(base_product, variations=100, rng=None):
     """
     Generate multiple variations of a base product for better training data.
+    Args:
+        base_product (dict): Product to vary.
+        variations (int): Number of variations to generate.
+        rng (np.random.Generator, optional): Source of randomness; a fresh unseeded one when None.
+    Returns:
+        pd.DataFrame: One row per variation, drawn in a single batch per column.
     """
-    products = []
+    if rng is None:
+        rng = np.random.default_rng()
+    n = variations
+    
+    # Vary dispatch dates
+    base_date = pd.Timestamp(base_product['DispatchDate'])
+    new_dates = base_date + pd.to_timedelta(rng.integers(-30, 31, size=n), unit='D')
     
-    for i in range(variations):
+    return _scenario_frame({
+        "Product": [f"{base_product['Product']} - Variant {i+1:03d}" for i in range(n)],
         # Create variations in weight, dimensions, and other properties
-        weight_variation = random.uniform(0.7, 1.3)
-        length_variation = random.uniform(0.8, 1.2)
-        width_variation = random.uniform(0.8, 1.2)
-        height_variation = random.uniform(0.8, 1.2)
-        
+        "Weight": np.round(base_product['Weight'] * rng.uniform(0.7, 1.3, size=n), 1),
+        "Length": np.round(base_product['Length'] * rng.uniform(0.8, 1.2, size=n), 1),
+        "Width": np.round(base_product['Width'] * rng.uniform(0.8, 1.2, size=n), 1),
+        "Height": np.round(base_product['Height'] * rng.uniform(0.8, 1.2, size=n), 1),
         # Vary the fragility and priority
-        fragile = random.choice([True, False]) if base_product.get('Fragile') else False
-        priority = random.choice(['High', 'Medium', 'Low'])
-        
-        # Vary warehouse zones
-        warehouse_zones = ["ZoneA", "ZoneB", "ZoneC", "ZoneD", "ZoneE", "ZoneF", "ZoneG", "ZoneH", "ZoneI", "ZoneJ",
-                          "Rack1", "Rack2", "Rack3", "Rack4", "Rack5", "Rack6", "Rack7", "Rack8", "Rack9", "Rack10",
-                          "Aisle1", "Aisle2", "Aisle3", "Aisle4", "Aisle5", "Aisle6", "Aisle7", "Aisle8", "Aisle9", "Aisle10",
-                          "SectionA", "SectionB", "SectionC", "SectionD", "SectionE", "SectionF", "SectionG", "SectionH",
-                          "Floor1", "Floor2", "Floor3", "Floor4", "Floor5",
-                          "ColdStorage", "DryStorage", "HazardousStorage", "BulkStorage", "SmallItemStorage",
-                          "PalletArea1", "PalletArea2", "PalletArea3", "PalletArea4", "PalletArea5",
-                          "ShelfArea1", "ShelfArea2", "ShelfArea3", "ShelfArea4", "ShelfArea5",
-                          "LoadingDock1", "LoadingDock2", "LoadingDock3", "LoadingDock4", "LoadingDock5",
-                          "ReceivingArea", "ShippingArea", "QualityControl", "ReturnsArea", "OverflowStorage",
-                          "Mezzanine1", "Mezzanine2", "Mezzanine3", "Mezzanine4", "Mezzanine5",
-                          "Basement1", "Basement2", "Basement3", "Basement4", "Basement5",
-                          "HighBay1", "HighBay2", "HighBay3", "HighBay4", "HighBay5",
-                          "AutomatedStorage1", "AutomatedStorage2", "AutomatedStorage3", "AutomatedStorage4", "AutomatedStorage5",
-                          "ManualStorage1", "ManualStorage2", "ManualStorage3", "ManualStorage4", "ManualStorage5",
-                          "FastMoving", "SlowMoving", "Seasonal", "BulkItems", "FragileItems",
-                          "HeavyItems", "LightItems", "LargeItems", "SmallItems", "MediumItems",
-                          "Priority1", "Priority2", "Priority3", "Priority4", "Priority5",
-                          "ExpressLane", "StandardLane", "EconomyLane", "PremiumLane", "OverflowLane"]
-        
-        destination = random.choice(warehouse_zones)
-        
-        # Vary dispatch dates
-        base_date = datetime.strptime(base_product['DispatchDate'], '%Y-%m-%d')
-        days_offset = random.randint(-30, 30)
-        new_date = base_date + timedelta(days=days_offset)
-        
-        product_variation = {
-            "Product": f"{base_product['Product']} - Variant {i+1:03d}",
-            "Weight": round(base_product['Weight'] * weight_variation, 1),
-            "Length": round(base_product['Length'] * length_variation, 1),
-            "Width": round(base_product['Width'] * width_variation, 1),
-            "Height": round(base_product['Height'] * height_variation, 1),
-            "Fragile": fragile,
-            "Destination": destination,
-            "Priority": priority,
-            "DispatchDate": new_date.strftime('%Y-%m-%d')
-        }
-        
-        products.append(product_variation)
-    
-    return products
+        "Fragile": rng.integers(0, 2, size=n).astype(bool) if base_product.get('Fragile') else np.zeros(n, dtype=bool),
+        "Destination": pd.Categorical.from_codes(rng.integers(len(WAREHOUSE_ZONES), size=n), dtype=ZONE_DTYPE),
+        "Priority": pd.Categorical.from_codes(rng.integers(len(PRIORITY_DTYPE.categories), size=n), dtype=PRIORITY_DTYPE),
+        "DispatchDate": new_dates.strftime('%Y-%m-%d')
+    })
 
-def generate_sample_scenarios():
+def generate_sample_scenarios(seed=None):
     """
     Generate 100 different realistic warehouse storage scenarios for training.
+    Args:
+        seed (int, optional): Seed for reproducible scenarios; random when None.
     Returns:
-        list: List of dictionaries with scenario name and data
+        list: List of dictionaries with scenario name and data (a DataFrame)
     """
     scenarios = []
+    # Each scenario draws from its own child stream of one seed sequence, so a seed
+    # reproduces every scenario and no two scenarios share random state
+    seed_sequence = np.random.SeedSequence(seed)
     
     # Original 20 scenarios (1-20) - now with 100 variations each
     # Scenario 1: Small Electronics (Fragile, Light)
@@ -87,9 +112,9 @@ def generate_sample_scenarios():
         {"Product": "Camera", "Weight": 2.6, "Length": 0.4, "Width": 0.3, "Height": 0.2, "Fragile": True, "Destination": "ZoneE", "Priority": "High", "DispatchDate": "2025-01-19"}
     ]
     
-    electronics_data = []
-    for base_product in electronics_base:
-        electronics_data.extend(generate_product_variations(base_product, 20))  # 20 variations each = 100 total
+    rng = np.random.default_rng(seed_sequence.spawn(1)[0])
+    electronics_data = pd.concat([generate_product_variations(base_product, 20, rng)  # 20 variations each = 100 total
+                                  for base_product in electronics_base], ignore_index=True)
     
     scenarios.append({"name": "Small Electronics", "data": electronics_data})
     
@@ -102,9 +127,9 @@ def generate_sample_scenarios():
         {"Product": "Compressor", "Weight": 264, "Length": 2.3, "Width": 1.6, "Height": 1.5, "Fragile": False, "Destination": "BulkItems", "Priority": "Medium", "DispatchDate": "2025-01-24"}
     ]
     
-    machinery_data = []
-    for base_product in machinery_base:
-        machinery_data.extend(generate_product_variations(base_product, 20))
+    rng = np.random.default_rng(seed_sequence.spawn(1)[0])
+    machinery_data = pd.concat([generate_product_variations(base_product, 20, rng)
+                                for base_product in machinery_base], ignore_index=True)
     
     scenarios.append({"name": "Heavy Machinery", "data": machinery_data})
     
@@ -141,82 +166,72 @@ def generate_sample_scenarios():
         "Edtech Technology", "Healthtech Technology", "Agritech Technology", "Cleantech Technology"
     ]
     
+    # Base values and their variation, one row per product: weight (lbs), length, width, height (ft)
+    base_low, base_high = [1, 0.3, 0.3, 0.2], [660, 13, 6.5, 5]
+    variation_low, variation_high = [0.6, 0.7, 0.7, 0.7], [1.4, 1.3, 1.3, 1.3]
+    
     for i, industry in enumerate(industries, 3):
-        # Generate 100 varied products for each industry
-        industry_data = []
+        # Generate 100 varied products for each industry, a column at a time
+        rng = np.random.default_rng(seed_sequence.spawn(1)[0])
+        n = 100
+        dimensions = np.round(rng.uniform(base_low, base_high, size=(n, 4)) *
+                              rng.uniform(variation_low, variation_high, size=(n, 4)), 1)
         
-        for j in range(100):
-            # Generate varied data for each product
-            base_weight = random.uniform(1, 660)  # 1-660 lbs
-            base_length = random.uniform(0.3, 13)  # 0.3-13 ft
-            base_width = random.uniform(0.3, 6.5)  # 0.3-6.5 ft
-            base_height = random.uniform(0.2, 5)  # 0.2-5 ft
-            
-            # Create product variations
-            weight_variation = random.uniform(0.6, 1.4)
-            length_variation = random.uniform(0.7, 1.3)
-            width_variation = random.uniform(0.7, 1.3)
-            height_variation = random.uniform(0.7, 1.3)
-            
-            product = {
-                "Product": f"{industry} Product {j+1:03d}",
-                "Weight": round(base_weight * weight_variation, 1),
-                "Length": round(base_length * length_variation, 1),
-                "Width": round(base_width * width_variation, 1),
-                "Height": round(base_height * height_variation, 1),
-                "Fragile": random.choice([True, False]),
-                "Destination": random.choice(["ZoneA", "ZoneB", "ZoneC", "ZoneD", "ZoneE", "ZoneF", "ZoneG", "ZoneH", "ZoneI", "ZoneJ",
-                                            "Rack1", "Rack2", "Rack3", "Rack4", "Rack5", "Rack6", "Rack7", "Rack8", "Rack9", "Rack10",
-                                            "Aisle1", "Aisle2", "Aisle3", "Aisle4", "Aisle5", "Aisle6", "Aisle7", "Aisle8", "Aisle9", "Aisle10",
-                                            "SectionA", "SectionB", "SectionC", "SectionD", "SectionE", "SectionF", "SectionG", "SectionH",
-                                            "Floor1", "Floor2", "Floor3", "Floor4", "Floor5",
-                                            "ColdStorage", "DryStorage", "HazardousStorage", "BulkStorage", "SmallItemStorage",
-                                            "PalletArea1", "PalletArea2", "PalletArea3", "PalletArea4", "PalletArea5",
-                                            "ShelfArea1", "ShelfArea2", "ShelfArea3", "ShelfArea4", "ShelfArea5",
-                                            "LoadingDock1", "LoadingDock2", "LoadingDock3", "LoadingDock4", "LoadingDock5",
-                                            "ReceivingArea", "ShippingArea", "QualityControl", "ReturnsArea", "OverflowStorage",
-                                            "Mezzanine1", "Mezzanine2", "Mezzanine3", "Mezzanine4", "Mezzanine5",
-                                            "Basement1", "Basement2", "Basement3", "Basement4", "Basement5",
-                                            "HighBay1", "HighBay2", "HighBay3", "HighBay4", "HighBay5",
-                                            "AutomatedStorage1", "AutomatedStorage2", "AutomatedStorage3", "AutomatedStorage4", "AutomatedStorage5",
-                                            "ManualStorage1", "ManualStorage2", "ManualStorage3", "ManualStorage4", "ManualStorage5",
-                                            "FastMoving", "SlowMoving", "Seasonal", "BulkItems", "FragileItems",
-                                            "HeavyItems", "LightItems", "LargeItems", "SmallItems", "MediumItems",
-                                            "Priority1", "Priority2", "Priority3", "Priority4", "Priority5",
-                                            "ExpressLane", "StandardLane", "EconomyLane", "PremiumLane", "OverflowLane"]),
-                "Priority": random.choice(["High", "Medium", "Low"]),
-                "DispatchDate": f"2025-{5 + (i//30):02d}-{(j%30) + 1:02d}"
-            }
-            
-            industry_data.append(product)
+        industry_data = _scenario_frame({
+            "Product": [f"{industry} Product {j+1:03d}" for j in range(n)],
+            "Weight": dimensions[:, 0],
+            "Length": dimensions[:, 1],
+            "Width": dimensions[:, 2],
+            "Height": dimensions[:, 3],
+            "Fragile": rng.integers(0, 2, size=n).astype(bool),
+            "Destination": pd.Categorical.from_codes(rng.integers(len(WAREHOUSE_ZONES), size=n), dtype=ZONE_DTYPE),
+            "Priority": pd.Categorical.from_codes(rng.integers(len(PRIORITY_DTYPE.categories), size=n), dtype=PRIORITY_DTYPE),
+            "DispatchDate": [f"2025-{5 + (i//30):02d}-{(j%30) + 1:02d}" for j in range(n)]
+        })
         
         scenarios.append({"name": industry, "data": industry_data})
     
     return scenarios
 
-def save_sample_data():
+def _write_csv(df, filename):
+    """
+    Write a DataFrame to CSV without its index.
+    Args:
+        df (pd.DataFrame): Data to write.
+        filename (str): Output path.
+    """
+    if pa is None:
+        df.to_csv(filename, index=False)
+        return
+    pa_csv.write_csv(pa.Table.from_pandas(df, preserve_index=False), filename,
+                     pa_csv.WriteOptions(quoting_style='needed'))
+
+def save_sample_data(seed=None):
     """
     Save all sample scenarios to CSV files for easy access.
+    Args:
+        seed (int, optional): Seed passed to generate_sample_scenarios.
     """
-    scenarios = generate_sample_scenarios()
+    scenarios = generate_sample_scenarios(seed)
+    # Writes fail on a fresh checkout without this
+    os.makedirs("data", exist_ok=True)
     
     for i, scenario in enumerate(scenarios, 1):
-        df = pd.DataFrame(scenario['data'])
-        filename = f"data/sample_scenario_{i:03d}_{scenario['name'].replace(' ', '_').replace('&', 'and').lower()}.csv"
-        df.to_csv(filename, index=False)
+        df = scenario['data']
+        filename = os.path.join("data", f"sample_scenario_{i:03d}_{scenario['name'].translate(FILENAME_CHARS).lower()}.csv")
+        _write_csv(df, filename)
         print(f"Saved: {filename} with {len(scenario['data'])} products")
     
-    # Create a master file with all scenarios
-    all_data = []
-    for scenario in scenarios:
-        for item in scenario['data']:
-            item['Scenario'] = scenario['name']
-            all_data.append(item)
-    
-    master_df = pd.DataFrame(all_data)
-    master_df.to_csv("data/all_sample_data.csv", index=False)
-    print("Saved: data/all_sample_data.csv")
-    print(f"Total products generated: {len(all_data)}")
+    # Create a master file with all scenarios; Scenario is stored as one small code per row
+    master_df = pd.concat([scenario['data'] for scenario in scenarios], ignore_index=True)
+    master_df['Scenario'] = pd.Categorical.from_codes(
+        np.repeat(np.arange(len(scenarios)), [len(scenario['data']) for scenario in scenarios]),
+        categories=[scenario['name'] for scenario in scenarios]
+    )
+    master_filename = os.path.join("data", "all_sample_data.csv")
+    _write_csv(master_df, master_filename)
+    print(f"Saved: {master_filename}")
+    print(f"Total products generated: {len(master_df)}")
     
     return scenarios
 
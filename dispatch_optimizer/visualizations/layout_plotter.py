@@ -6,6 +6,28 @@ Visualizes 2D and 3D warehouse storage layout using realistic packing algorithms
 import plotly.graph_objects as go
 import numpy as np
 
+# Box colours, cycled through in plot order, and their translucent fills for the 2D layout
+COLORS = ['#1f77b4', '#ff7f0e', '#2ca02c', '#d62728', '#9467bd', '#8c564b', '#e377c2', '#7f7f7f', '#bcbd22', '#17becf']
+FILL_COLORS = [f'rgba({int(c[1:3], 16)},{int(c[3:5], 16)},{int(c[5:7], 16)},0.3)' for c in COLORS]
+
+# Closed outline of a unit rectangle; the trailing NaN separates consecutive boxes in one trace
+RECT_X = np.array([0, 1, 1, 0, 0, np.nan])
+RECT_Y = np.array([0, 0, 1, 1, 0, np.nan])
+
+# Unit-cube corners and the triangle drawn for each of a box's six faces
+BOX_CORNERS = np.array([
+    [0, 0, 0], [1, 0, 0], [1, 1, 0], [0, 1, 0],
+    [0, 0, 1], [1, 0, 1], [1, 1, 1], [0, 1, 1]
+], dtype=np.float64)
+BOX_FACES = np.array([
+    [0, 1, 2],  # Bottom
+    [4, 5, 6],  # Top
+    [0, 1, 5],  # Front
+    [2, 3, 7],  # Back
+    [0, 3, 7],  # Left
+    [1, 2, 6]   # Right
+])
+
 def simple_pack_2d(products, storage_length, storage_width):
     """
     Simple 2D packing algorithm - places boxes in rows for warehouse storage.
@@ -108,46 +130,50 @@ def plot_layout(dispatch_plan, constraints):
     
     fig = go.Figure()
     
-    # Draw storage area outline
+    # Draw storage area outline, underneath the product boxes
     fig.add_shape(
         type="rect",
         x0=0, y0=0,
         x1=storage_length, y1=storage_width,
         line=dict(color="black", width=3),
-        fillcolor="rgba(200,200,200,0.1)"
+        fillcolor="rgba(200,200,200,0.1)",
+        layer="below"
     )
     
-    # Draw each product
-    colors = ['#1f77b4', '#ff7f0e', '#2ca02c', '#d62728', '#9467bd', '#8c564b', '#e377c2', '#7f7f7f', '#bcbd22', '#17becf']
-    
-    for i, pos in enumerate(positions):
-        product = pos['product']
-        color = colors[i % len(colors)]
-        
-        # Convert hex to rgba for fillcolor
-        hex_color = color.lstrip('#')
-        r = int(hex_color[0:2], 16)
-        g = int(hex_color[2:4], 16)
-        b = int(hex_color[4:6], 16)
-        rgba_color = f'rgba({r},{g},{b},0.3)'
+    # Draw products as one filled outline trace per colour, each box closed and NaN-separated,
+    # instead of a layout shape and annotation per product
+    if positions:
+        products = [pos['product'] for pos in positions]
+        origins = np.array([(pos['x'], pos['y']) for pos in positions], dtype=np.float64)
+        sizes = np.array([(p['Length'], p['Width']) for p in products], dtype=np.float64)
         
-        # Draw product box
-        fig.add_shape(
-            type="rect",
-            x0=pos['x'], y0=pos['y'],
-            x1=pos['x'] + product['Length'], y1=pos['y'] + product['Width'],
-            line=dict(color=color, width=2),
-            fillcolor=rgba_color
-        )
+        outline_x = origins[:, [0]] + sizes[:, [0]] * RECT_X
+        outline_y = origins[:, [1]] + sizes[:, [1]] * RECT_Y
+        color_index = np.arange(len(positions)) % len(COLORS)
+        for c, (color, rgba_color) in enumerate(zip(COLORS, FILL_COLORS)):
+            boxes = color_index == c
+            if not boxes.any():
+                continue
+            fig.add_trace(go.Scatter(
+                x=outline_x[boxes].ravel(),
+                y=outline_y[boxes].ravel(),
+                mode='lines',
+                fill='toself',
+                fillcolor=rgba_color,
+                line=dict(color=color, width=2),
+                hoverinfo='skip'
+            ))
         
-        # Add product label
-        fig.add_annotation(
-            x=pos['x'] + product['Length']/2,
-            y=pos['y'] + product['Width']/2,
-            text=f"{product['Product']}<br>({product['Length']}x{product['Width']}x{product['Height']} ft, {product['Weight']} lbs)",
-            showarrow=False,
-            font=dict(size=8)
-        )
+        # Add product labels
+        centres = origins + sizes / 2
+        fig.add_trace(go.Scatter(
+            x=centres[:, 0],
+            y=centres[:, 1],
+            mode='text',
+            text=[f"{p['Product']}<br>({p['Length']}x{p['Width']}x{p['Height']} ft, {p['Weight']} lbs)" for p in products],
+            textfont=dict(size=8),
+            hoverinfo='text'
+        ))
     
     fig.update_layout(
         title="2D Warehouse Storage Layout (Top View)",
@@ -192,70 +218,55 @@ def plot_layout_3d(dispatch_plan, constraints):
         [0, 4], [1, 5], [2, 6], [3, 7]   # Vertical
     ]
     
+    # All edges in one line trace; the NaN after each edge breaks the line between segments
+    edge_points = []
     for edge in edges:
-        start = storage_vertices[edge[0]]
-        end = storage_vertices[edge[1]]
-        fig.add_trace(go.Scatter3d(
-            x=[start[0], end[0]],
-            y=[start[1], end[1]],
-            z=[start[2], end[2]],
-            mode='lines',
-            line=dict(color='black', width=3),
-            showlegend=False
-        ))
+        edge_points += [storage_vertices[edge[0]], storage_vertices[edge[1]], [np.nan, np.nan, np.nan]]
+    edge_points = np.array(edge_points, dtype=np.float64)
+    fig.add_trace(go.Scatter3d(
+        x=edge_points[:, 0],
+        y=edge_points[:, 1],
+        z=edge_points[:, 2],
+        mode='lines',
+        line=dict(color='black', width=3),
+        showlegend=False
+    ))
     
-    # Draw each product as 3D boxes
-    colors = ['#1f77b4', '#ff7f0e', '#2ca02c', '#d62728', '#9467bd', '#8c564b', '#e377c2', '#7f7f7f', '#bcbd22', '#17becf']
+    # Draw all products as one batched mesh plus one label trace, instead of two traces per product
     
-    for i, pos in enumerate(positions):
-        product = pos['product']
-        color = colors[i % len(colors)]
+    if positions:
+        products = [pos['product'] for pos in positions]
+        origins = np.array([(pos['x'], pos['y'], pos['z']) for pos in positions], dtype=np.float64)
+        sizes = np.array([(p['Length'], p['Width'], p['Height']) for p in products], dtype=np.float64)
         
-        # Create 3D box vertices
-        x = pos['x']
-        y = pos['y']
-        z = pos['z']
-        l = product['Length']
-        w = product['Width']
-        h = product['Height']
+        # Eight corners per box, then one triangle per face offset to that box's corners
+        vertices = (origins[:, None, :] + BOX_CORNERS[None, :, :] * sizes[:, None, :]).reshape(-1, 3)
+        triangles = (BOX_FACES[None, :, :] + 8 * np.arange(len(positions))[:, None, None]).reshape(-1, 3)
+        box_colors = [COLORS[i % len(COLORS)] for i in range(len(positions))]
         
-        # Box vertices
-        vertices = [
-            [x, y, z], [x+l, y, z], [x+l, y+w, z], [x, y+w, z],
-            [x, y, z+h], [x+l, y, z+h], [x+l, y+w, z+h], [x, y+w, z+h]
-        ]
-        
-        # Box faces (triangles for each face)
-        faces = [
-            [0, 1, 2, 3],  # Bottom
-            [4, 5, 6, 7],  # Top
-            [0, 1, 5, 4],  # Front
-            [2, 3, 7, 6],  # Back
-            [0, 3, 7, 4],  # Left
-            [1, 2, 6, 5]   # Right
-        ]
-        
-        # Add 3D mesh for the box
         fig.add_trace(go.Mesh3d(
-            x=[v[0] for v in vertices],
-            y=[v[1] for v in vertices],
-            z=[v[2] for v in vertices],
-            i=[face[0] for face in faces],
-            j=[face[1] for face in faces],
-            k=[face[2] for face in faces],
-            color=color,
+            x=vertices[:, 0],
+            y=vertices[:, 1],
+            z=vertices[:, 2],
+            i=triangles[:, 0],
+            j=triangles[:, 1],
+            k=triangles[:, 2],
+            facecolor=np.repeat(box_colors, len(BOX_FACES)),
             opacity=0.7,
-            name=product['Product'],
+            text=np.repeat([p['Product'] for p in products], 8),
+            hoverinfo='text',
+            showlegend=False,
             showscale=False
         ))
         
-        # Add product label
+        # Add product labels
+        centres = origins + sizes / 2
         fig.add_trace(go.Scatter3d(
-            x=[x + l/2],
-            y=[y + w/2],
-            z=[z + h + 0.5],
+            x=centres[:, 0],
+            y=centres[:, 1],
+            z=origins[:, 2] + sizes[:, 2] + 0.5,
             mode='text',
-            text=[f"{product['Product']}<br>({l}x{w}x{h} ft, {product['Weight']} lbs)"],
+            text=[f"{p['Product']}<br>({p['Length']}x{p['Width']}x{p['Height']} ft, {p['Weight']} lbs)" for p in products],
             showlegend=False,
             textfont=dict(size=8)
         ))
@@ -3,13 +3,208 @@ route_visualizer.py
 Visualizes dispatch routes, vehicle assignments, and delivery sequences.
 """
 
+import copy
 import plotly.graph_objects as go
-import plotly.express as px
+from plotly.colors import get_colorscale
 from plotly.subplots import make_subplots
 import numpy as np
 import pandas as pd
 from datetime import datetime, timedelta
 from typing import List, Dict, Tuple
+from dispatch_optimizer.agents.dispatch_planner import MILES_TO_KM
+
+# Above this many routes the map draws every route as one NaN-separated trace
+MAX_ROUTE_TRACES = 20
+
+# Figures with more points than this switch to WebGL scatter traces
+WEBGL_POINT_THRESHOLD = 2000
+
+# Route polylines longer than this are simplified before plotting
+MAX_ROUTE_POINTS = 500
+
+# Simplification tolerance as a fraction of the route's bounding-box diagonal
+SIMPLIFY_TOLERANCE = 0.005
+
+# Delivery heatmap grid over the planner's service area (stops lie within 50 of the warehouse)
+HEATMAP_BINS = 20
+SERVICE_AREA_EDGES = np.linspace(-50, 50, HEATMAP_BINS + 1)
+
+# Route-level fields shared by the summary charts, with their defaults
+ROUTE_FIELD_DEFAULTS = {
+    'vehicle_id': 'Unknown', 'driver_name': 'Unknown', 'total_distance': 0, 'total_cost': 0,
+    'products_delivered': 0, 'total_weight': 0, 'total_volume': 0, 'estimated_duration': 0,
+    'fuel_cost': 0, 'operating_cost': 0, 'driver_cost': 0
+}
+
+# Marker colours for routes batched into a single trace
+ROUTE_COLORSCALE = get_colorscale('Turbo')
+HEATMAP_COLORSCALE = get_colorscale('Viridis')
+
+BAR_GRID_SPECS = [[{"type": "bar"}, {"type": "bar"}],
+                  [{"type": "bar"}, {"type": "bar"}]]
+
+# Subplot axes as placed by make_subplots for (1,1), (1,2), (2,1), (2,2)
+BAR_GRID_AXES = [('x', 'y'), ('x2', 'y2'), ('x3', 'y3'), ('x4', 'y4')]
+
+_bar_grid_layouts = {}
+
+# Hover text for one trace per route, filled from the trace's meta values
+ROUTE_META_HOVERTEMPLATE = (
+    "<b>Route %{meta[0]}</b><br>"
+    "Vehicle: %{meta[1]}<br>"
+    "Driver: %{meta[2]}<br>"
+    "Distance: %{meta[3]:.1f} km<br>"
+    "Cost: ₹%{meta[4]:.2f}<br>"
+    "Products: %{meta[5]}<br>"
+    "<extra></extra>"
+)
+
+# Hover text for routes batched into one trace, filled per point
+ROUTE_HOVERTEMPLATE = (
+    "<b>Route %{customdata[0]}</b><br>"
+    "%{text}<br>"
+    "Distance: %{customdata[1]:.1f} km<br>"
+    "Cost: ₹%{customdata[2]:.2f}<br>"
+    "Products: %{customdata[3]}<br>"
+    "<extra></extra>"
+)
+
+def _normalize_routes(routes: List[Dict]) -> pd.DataFrame:
+    """
+    Route-level fields as one frame, built from the routes as they are now.
+    Args:
+        routes (list of dict): List of optimized routes
+    Returns:
+        pd.DataFrame: One row per route, indexed by position in routes, with every
+            ROUTE_FIELD_DEFAULTS column filled plus total_distance_km
+    """
+    positions = [i for i, route in enumerate(routes) if route]
+    df = pd.DataFrame([routes[i] for i in positions], index=positions,
+                      columns=[*ROUTE_FIELD_DEFAULTS, 'total_distance_km'])
+    df = df.fillna(ROUTE_FIELD_DEFAULTS)
+    # The planner stores the km distance; only routes saved before it did need converting here
+    distance_km = pd.to_numeric(df['total_distance_km'])
+    missing = distance_km.isna()
+    if missing.any():
+        distance_km[missing] = df.loc[missing, 'total_distance'] * MILES_TO_KM
+    df['total_distance_km'] = distance_km
+    return df
+
+def _build_figure(traces: List[Dict], layout: Dict) -> go.Figure:
+    """
+    Assemble a figure from trace and layout dicts without validating them against the plotly schema.
+    Args:
+        traces (list of dict): Trace dicts, each with a 'type' key
+        layout (dict): Layout dict
+    Returns:
+        plotly.graph_objs.Figure: Figure wrapping the given traces and layout
+    """
+    return go.Figure(dict(data=traces, layout=layout), _validate=False)
+
+def _bar_grid_layout(subplot_titles: Tuple[str, ...]) -> Dict:
+    """
+    Layout of a 2x2 bar chart grid, built by make_subplots once per set of titles.
+    Args:
+        subplot_titles (tuple of str): Title of each subplot in row-major order
+    Returns:
+        dict: Copy of the grid layout, safe for the caller to modify
+    """
+    if subplot_titles not in _bar_grid_layouts:
+        layout = make_subplots(rows=2, cols=2, subplot_titles=subplot_titles, specs=BAR_GRID_SPECS).layout.to_plotly_json()
+        layout.pop('template', None)
+        _bar_grid_layouts[subplot_titles] = layout
+    return copy.deepcopy(_bar_grid_layouts[subplot_titles])
+
+def _bar_grid_figure(title: str, x: np.ndarray, bars: List[Tuple[str, str, np.ndarray]]) -> go.Figure:
+    """
+    2x2 grid of bar charts sharing the same categories.
+    Args:
+        title (str): Figure title
+        x (np.ndarray): Bar categories
+        bars (list of tuple): (subplot title, trace name, values) per subplot in row-major order
+    Returns:
+        plotly.graph_objs.Figure: Bar grid figure
+    """
+    layout = _bar_grid_layout(tuple(subplot_title for subplot_title, _, _ in bars))
+    layout.update(title=dict(text=title), height=600, showlegend=False)
+    traces = [
+        dict(type='bar', x=x, y=values, name=name, xaxis=xaxis, yaxis=yaxis)
+        for (_, name, values), (xaxis, yaxis) in zip(bars, BAR_GRID_AXES)
+    ]
+    return _build_figure(traces, layout)
+
+def _coerce_locations(routes: List[Dict]) -> List:
+    """
+    Validated stop coordinates of each route, read from the routes as they are now.
+    Args:
+        routes (list of dict): List of optimized routes
+    Returns:
+        list: Per route, an (N, 2) float64 array of its valid stop locations, or None when
+            the route has no stop list. Invalid locations are skipped.
+    """
+    route_stops = []
+    for route in routes:
+        if not route or 'route' not in route:
+            route_stops.append(None)
+            continue
+            
+        stops = np.empty((len(route['route']), 2), dtype=np.float64)
+        count = 0
+        for route_item in route['route']:
+            location = route_item.get('location', (0, 0))
+            # Ensure location is a tuple of numbers
+            if isinstance(location, (list, tuple)) and len(location) >= 2:
+                try:
+                    stops[count, 0] = float(location[0])
+                    stops[count, 1] = float(location[1])
+                    count += 1
+                except (ValueError, TypeError):
+                    # Skip invalid coordinates
+                    continue
+        route_stops.append(stops[:count])
+    return route_stops
+
+def _simplify_path(coords: np.ndarray, max_points: int) -> np.ndarray:
+    """
+    Reduce a polyline with Ramer-Douglas-Peucker, then stride it down if still too long.
+    Args:
+        coords (np.ndarray): (N, 2) path coordinates
+        max_points (int): Upper bound on the points returned
+    Returns:
+        np.ndarray: Subset of coords keeping the first and last points
+    """
+    diagonal = np.hypot(*(coords.max(axis=0) - coords.min(axis=0)))
+    epsilon = diagonal * SIMPLIFY_TOLERANCE
+    keep = np.zeros(len(coords), dtype=bool)
+    keep[0] = keep[-1] = True
+    
+    stack = [(0, len(coords) - 1)]
+    while stack:
+        start, end = stack.pop()
+        if end - start < 2:
+            continue
+        
+        # Distance of the interior points from the chord start -> end
+        interior = coords[start + 1:end] - coords[start]
+        dx, dy = coords[end] - coords[start]
+        length = np.hypot(dx, dy)
+        if length > 0:
+            distances = np.abs(dx * interior[:, 1] - dy * interior[:, 0]) / length
+        else:
+            distances = np.hypot(interior[:, 0], interior[:, 1])
+        
+        farthest = int(np.argmax(distances))
+        if distances[farthest] > epsilon:
+            split = start + 1 + farthest
+            keep[split] = True
+            stack.append((start, split))
+            stack.append((split, end))
+    
+    simplified = coords[keep]
+    if len(simplified) > max_points:
+        stride = -(-len(simplified) // max_points)
+        simplified = np.vstack((simplified[:-1:stride], simplified[-1]))
+    return simplified
 
 def plot_route_map(routes: List[Dict], title: str = "Dispatch Routes") -> go.Figure:
     """
@@ -23,72 +218,98 @@ def plot_route_map(routes: List[Dict], title: str = "Dispatch Routes") -> go.Fig
     if not routes:
         return go.Figure()
     
-    fig = go.Figure()
-    
     # Add warehouse location
-    fig.add_trace(go.Scatter(
+    traces = [dict(
+        type='scatter',
         x=[0], y=[0],
         mode='markers',
         marker=dict(size=20, color='red', symbol='star'),
         name='Warehouse',
         showlegend=True
-    ))
+    )]
     
-    # Add routes
-    for i, route in enumerate(routes):
-        if not route or 'route' not in route:
+    # Extract route coordinates
+    route_paths = []
+    for i, (route, stops) in enumerate(zip(routes, _coerce_locations(routes))):
+        if stops is None:
             continue
             
-        # Extract route coordinates
-        route_coords: List[Tuple[float, float]] = [(0.0, 0.0)]  # Start at warehouse
+        # Start and end at the warehouse
+        count = len(stops) + 1
+        coords = np.zeros((count + 1, 2), dtype=np.float64)
+        coords[1:count] = stops
         
-        for route_item in route['route']:
-            location = route_item.get('location', (0, 0))
-            # Ensure location is a tuple of numbers
-            if isinstance(location, (list, tuple)) and len(location) >= 2:
-                try:
-                    x = float(location[0])
-                    y = float(location[1])
-                    route_coords.append((x, y))
-                except (ValueError, TypeError):
-                    # Skip invalid coordinates
-                    continue
-            else:
-                # Skip invalid location format
-                continue
-        
-        # Add return to warehouse
-        route_coords.append((0, 0))
-        
-        if len(route_coords) > 2:  # At least warehouse -> delivery -> warehouse
-            x_coords = [coord[0] for coord in route_coords]
-            y_coords = [coord[1] for coord in route_coords]
-            
-            fig.add_trace(go.Scatter(
-                x=x_coords,
-                y=y_coords,
+        if count > 1:  # At least warehouse -> delivery -> warehouse
+            if len(coords) > MAX_ROUTE_POINTS:
+                coords = _simplify_path(coords, MAX_ROUTE_POINTS)
+            route_paths.append((i, route, coords))
+    
+    total_points = sum(len(coords) for _, _, coords in route_paths)
+    scatter = 'scattergl' if total_points > WEBGL_POINT_THRESHOLD else 'scatter'
+    
+    distance_km = _normalize_routes(routes)['total_distance_km']
+    
+    if len(route_paths) <= MAX_ROUTE_TRACES:
+        traces.extend(
+            dict(
+                type=scatter,
+                x=coords[:, 0],
+                y=coords[:, 1],
                 mode='lines+markers',
                 name=f"Route {i+1}: {route.get('vehicle_id', 'Unknown')}",
                 line=dict(width=2),
                 marker=dict(size=8),
-                hovertemplate=f"<b>Route {i+1}</b><br>" +
-                             f"Vehicle: {route.get('vehicle_id', 'Unknown')}<br>" +
-                             f"Driver: {route.get('driver_name', 'Unknown')}<br>" +
-                             f"Distance: {route.get('total_distance', 0) * 1.60934:.1f} km<br>" +
-                             f"Cost: ₹{route.get('total_cost', 0):.2f}<br>" +
-                             f"Products: {route.get('products_delivered', 0)}<br>" +
-                             "<extra></extra>"
-            ))
+                meta=[
+                    i + 1,
+                    route.get('vehicle_id', 'Unknown'),
+                    route.get('driver_name', 'Unknown'),
+                    distance_km[i],
+                    route.get('total_cost', 0),
+                    route.get('products_delivered', 0)
+                ],
+                hovertemplate=ROUTE_META_HOVERTEMPLATE
+            )
+            for i, route, coords in route_paths
+        )
+    else:
+        # One trace for the whole fleet, routes separated by a NaN row
+        points = np.concatenate([
+            np.vstack((coords, (np.nan, np.nan))) for _, _, coords in route_paths
+        ])
+        lengths = [len(coords) + 1 for _, _, coords in route_paths]
+        route_info = np.array([
+            (i + 1,
+             distance_km[i],
+             route.get('total_cost', 0),
+             route.get('products_delivered', 0))
+            for i, route, _ in route_paths
+        ], dtype=np.float32)
+        route_labels = np.array([
+            f"Vehicle: {route.get('vehicle_id', 'Unknown')}<br>Driver: {route.get('driver_name', 'Unknown')}"
+            for _, route, _ in route_paths
+        ])
+        
+        traces.append(dict(
+            type=scatter,
+            x=points[:, 0],
+            y=points[:, 1],
+            mode='lines+markers',
+            name=f"Routes ({len(route_paths)})",
+            connectgaps=False,
+            line=dict(width=2, color='rgba(120,120,120,0.6)'),
+            marker=dict(size=8, color=np.repeat(route_info[:, 0], lengths), colorscale=ROUTE_COLORSCALE),
+            customdata=np.repeat(route_info, lengths, axis=0),
+            text=np.repeat(route_labels, lengths),
+            hovertemplate=ROUTE_HOVERTEMPLATE
+        ))
     
-    fig.update_layout(
-        title=title,
-        xaxis_title="X Coordinate (km)",
-        yaxis_title="Y Coordinate (km)",
+    return _build_figure(traces, dict(
+        title=dict(text=title),
+        xaxis=dict(title=dict(text="X Coordinate (km)")),
+        yaxis=dict(title=dict(text="Y Coordinate (km)")),
         height=600,
         showlegend=True
-    )
-    
-    return fig
+    ))
 
 def plot_route_timeline(routes: List[Dict]) -> go.Figure:
     """
@@ -98,76 +319,80 @@ def plot_route_timeline(routes: List[Dict]) -> go.Figure:
     Returns:
         plotly.graph_objs.Figure: Timeline figure
     """
-    fig = go.Figure()
-    
     colors = ['#1f77b4', '#ff7f0e', '#2ca02c', '#d62728', '#9467bd', '#8c564b', '#e377c2', '#7f7f7f', '#bcbd22', '#17becf']
     
+    total_points = sum(len(route['route']) + 2 for route in routes if route and 'route' in route)
+    scatter = 'scattergl' if total_points > WEBGL_POINT_THRESHOLD else 'scatter'
+    
+    current_time = datetime.now()
+    max_stops = max((len(route['route']) for route in routes if route and 'route' in route), default=0)
+    delivery_labels = [f"Delivery {j+1}" for j in range(max_stops)]
+    
+    timelines = []
     for i, route in enumerate(routes):
         if not route or 'route' not in route:
             continue
             
-        color = colors[i % len(colors)]
         vehicle_id = route.get('vehicle_id', f'Vehicle {i+1}')
+        stops = route['route']
         
-        # Create timeline data
-        current_time = datetime.now()
-        timeline_data = []
-        
-        # Add warehouse departure
-        timeline_data.append({
-            'time': current_time,
-            'location': 'Warehouse',
-            'action': 'Departure',
-            'product': 'Start Route'
-        })
-        
-        # Add delivery stops
-        for j, route_item in enumerate(route['route']):
-            product = route_item.get('product', {})
-            estimated_arrival = route_item.get('estimated_arrival', current_time + timedelta(hours=j+1))
-            
-            timeline_data.append({
-                'time': estimated_arrival,
-                'location': f"Delivery {j+1}",
-                'action': 'Delivery',
-                'product': product.get('Product', f'Product {j+1}')
-            })
-        
-        # Add warehouse return
-        total_duration = route.get('estimated_duration', 0)
-        return_time = current_time + timedelta(hours=total_duration)
-        timeline_data.append({
-            'time': return_time,
-            'location': 'Warehouse',
-            'action': 'Return',
-            'product': 'End Route'
-        })
-        
-        # Plot timeline
-        times = [item['time'] for item in timeline_data]
-        locations = [item['location'] for item in timeline_data]
+        # Warehouse departure, delivery stops, warehouse return
+        times = [current_time]
+        times.extend([
+            route_item.get('estimated_arrival') or current_time + timedelta(hours=j+1)
+            for j, route_item in enumerate(stops)
+        ])
+        times.append(current_time + timedelta(hours=route.get('estimated_duration', 0)))
+        locations = ['Warehouse', *delivery_labels[:len(stops)], 'Warehouse']
+        timelines.append((vehicle_id, colors[i % len(colors)], times, locations))
+    
+    if len(timelines) <= MAX_ROUTE_TRACES:
+        traces = [
+            dict(
+                type=scatter,
+                x=times,
+                y=[vehicle_id] * len(times),
+                mode='lines+markers',
+                name=vehicle_id,
+                line=dict(color=color, width=3),
+                marker=dict(size=8, color=color),
+                hovertemplate='<b>%{y}</b><br>Time: %{x}<br>Location: %{text}<extra></extra>',
+                text=locations
+            )
+            for vehicle_id, color, times, locations in timelines
+        ]
+    else:
+        # One trace for the whole fleet, vehicles separated by a gap
+        lengths = [len(times) + 1 for _, _, times, _ in timelines]
+        all_times = np.array(
+            [t for _, _, times, _ in timelines for t in (*times, None)], dtype=object
+        )
+        all_vehicles = np.repeat(np.array([vehicle_id for vehicle_id, _, _, _ in timelines], dtype=object), lengths)
+        all_locations = np.array(
+            [label for _, _, _, locations in timelines for label in (*locations, '')], dtype=object
+        )
         
-        fig.add_trace(go.Scatter(
-            x=times,
-            y=[vehicle_id] * len(times),
+        traces = [dict(
+            type=scatter,
+            x=all_times,
+            y=all_vehicles,
             mode='lines+markers',
-            name=vehicle_id,
-            line=dict(color=color, width=3),
-            marker=dict(size=8, color=color),
+            name=f"Vehicles ({len(timelines)})",
+            connectgaps=False,
+            line=dict(color='rgba(120,120,120,0.6)', width=3),
+            marker=dict(size=8, color=np.repeat(np.arange(len(timelines)), lengths), colorscale=ROUTE_COLORSCALE),
             hovertemplate='<b>%{y}</b><br>Time: %{x}<br>Location: %{text}<extra></extra>',
-            text=locations
-        ))
+            text=all_locations
+        )]
     
-    fig.update_layout(
-        title="Delivery Timeline",
-        xaxis_title="Time",
-        yaxis_title="Vehicle",
+    return _build_figure(traces, dict(
+        title=dict(text="Delivery Timeline"),
+        xaxis=dict(title=dict(text="Time")),
+        yaxis=dict(title=dict(text="Vehicle")),
         showlegend=True,
         height=400,
         hovermode='closest'
-    )
-    
-    return fig
+    ))
 
 def plot_vehicle_utilization(routes: List[Dict]) -> go.Figure:
     """
@@ -181,66 +406,16 @@ def plot_vehicle_utilization(routes: List[Dict]) -> go.Figure:
         return go.Figure()
     
     # Extract vehicle data
-    vehicle_data = []
-    for route in routes:
-        if not route:
-            continue
-            
-        vehicle_data.append({
-            'vehicle_id': route.get('vehicle_id', 'Unknown'),
-            'driver_name': route.get('driver_name', 'Unknown'),
-            'total_distance': route.get('total_distance', 0),
-            'total_cost': route.get('total_cost', 0),
-            'products_delivered': route.get('products_delivered', 0),
-            'total_weight': route.get('total_weight', 0),
-            'total_volume': route.get('total_volume', 0),
-            'estimated_duration': route.get('estimated_duration', 0)
-        })
-    
-    if not vehicle_data:
+    df = _normalize_routes(routes)
+    if df.empty:
         return go.Figure()
     
-    df = pd.DataFrame(vehicle_data)
-    
-    # Create subplots
-    fig = make_subplots(
-        rows=2, cols=2,
-        subplot_titles=('Distance per Vehicle', 'Cost per Vehicle', 'Products per Vehicle', 'Weight per Vehicle'),
-        specs=[[{"type": "bar"}, {"type": "bar"}],
-               [{"type": "bar"}, {"type": "bar"}]]
-    )
-    
-    # Distance per vehicle
-    fig.add_trace(
-        go.Bar(x=df['vehicle_id'], y=df['total_distance'] * 1.60934, name='Distance (km)'),
-        row=1, col=1
-    )
-    
-    # Cost per vehicle
-    fig.add_trace(
-        go.Bar(x=df['vehicle_id'], y=df['total_cost'], name='Cost (₹)'),
-        row=1, col=2
-    )
-    
-    # Products per vehicle
-    fig.add_trace(
-        go.Bar(x=df['vehicle_id'], y=df['products_delivered'], name='Products'),
-        row=2, col=1
-    )
-    
-    # Weight per vehicle
-    fig.add_trace(
-        go.Bar(x=df['vehicle_id'], y=df['total_weight'], name='Weight (lbs)'),
-        row=2, col=2
-    )
-    
-    fig.update_layout(
-        title="Vehicle Utilization Metrics",
-        height=600,
-        showlegend=False
-    )
-    
-    return fig
+    return _bar_grid_figure("Vehicle Utilization Metrics", df['vehicle_id'].to_numpy(), [
+        ('Distance per Vehicle', 'Distance (km)', df['total_distance_km'].to_numpy()),
+        ('Cost per Vehicle', 'Cost (₹)', df['total_cost'].to_numpy()),
+        ('Products per Vehicle', 'Products', df['products_delivered'].to_numpy()),
+        ('Weight per Vehicle', 'Weight (lbs)', df['total_weight'].to_numpy()),
+    ])
 
 def plot_cost_breakdown(routes: List[Dict]) -> go.Figure:
     """
@@ -254,24 +429,50 @@ def plot_cost_breakdown(routes: List[Dict]) -> go.Figure:
         return go.Figure()
     
     # Calculate total costs
-    total_fuel_cost = sum(route.get('fuel_cost', 0) for route in routes)
-    total_operating_cost = sum(route.get('operating_cost', 0) for route in routes)
-    total_driver_cost = sum(route.get('driver_cost', 0) for route in routes)
-    total_cost = sum(route.get('total_cost', 0) for route in routes)
+    totals = _normalize_routes(routes)[['fuel_cost', 'operating_cost', 'driver_cost', 'total_cost']].sum()
+    total_fuel_cost, total_operating_cost, total_driver_cost, total_cost = totals.tolist()
     
     # Create pie chart
-    fig = go.Figure(data=[go.Pie(
+    return _build_figure([dict(
+        type='pie',
         labels=['Fuel Cost', 'Operating Cost', 'Driver Cost'],
         values=[total_fuel_cost, total_operating_cost, total_driver_cost],
         hole=0.3
-    )])
-    
-    fig.update_layout(
-        title=f"Cost Breakdown - Total: ₹{total_cost:.2f}",
+    )], dict(
+        title=dict(text=f"Cost Breakdown - Total: ₹{total_cost:.2f}"),
         height=400
-    )
-    
-    return fig
+    ))
+
+def _bin_index(values: np.ndarray, edges: np.ndarray) -> np.ndarray:
+    """
+    Map values onto evenly spaced bins; the last bin includes its right edge.
+    Args:
+        values (np.ndarray): Values inside [edges[0], edges[-1]]
+        edges (np.ndarray): Evenly spaced bin edges
+    Returns:
+        np.ndarray: Bin index per value
+    """
+    bins = len(edges) - 1
+    span = edges[-1] - edges[0]
+    if span <= 0:
+        return np.full(len(values), bins - 1, dtype=np.intp)
+    return np.minimum(((values - edges[0]) * (bins / span)).astype(np.intp), bins - 1)
+
+def _bin_locations(x_coords: np.ndarray, y_coords: np.ndarray, x_edges: np.ndarray, y_edges: np.ndarray) -> np.ndarray:
+    """
+    Count points per cell of a uniform 2D grid, matching np.histogram2d.
+    Args:
+        x_coords (np.ndarray): X coordinates
+        y_coords (np.ndarray): Y coordinates
+        x_edges (np.ndarray): Evenly spaced x bin edges
+        y_edges (np.ndarray): Evenly spaced y bin edges
+    Returns:
+        np.ndarray: Counts with shape (len(x_edges) - 1, len(y_edges) - 1)
+    """
+    nx, ny = len(x_edges) - 1, len(y_edges) - 1
+    ix = _bin_index(x_coords, x_edges)
+    iy = _bin_index(y_coords, y_edges)
+    return np.bincount(ix * ny + iy, minlength=nx * ny).reshape(nx, ny).astype(np.float64)
 
 def plot_delivery_heatmap(routes: List[Dict]) -> go.Figure:
     """
@@ -285,54 +486,39 @@ def plot_delivery_heatmap(routes: List[Dict]) -> go.Figure:
         return go.Figure()
     
     # Collect all delivery locations
-    all_locations = []
-    for route in routes:
-        if not route or 'route' not in route:
-            continue
-            
-        for route_item in route['route']:
-            location = route_item.get('location', (0, 0))
-            # Ensure location is a tuple of numbers
-            if isinstance(location, (list, tuple)) and len(location) >= 2:
-                try:
-                    x = float(location[0])
-                    y = float(location[1])
-                    all_locations.append((x, y))
-                except (ValueError, TypeError):
-                    # Skip invalid coordinates
-                    continue
-            else:
-                # Skip invalid location format
-                continue
-    
-    if not all_locations:
+    route_stops = [stops for stops in _coerce_locations(routes) if stops is not None]
+    locations = np.concatenate(route_stops) if route_stops else np.empty((0, 2))
+    if len(locations) == 0:
         return go.Figure()
     
-    # Create grid for heatmap
-    x_coords = [loc[0] for loc in all_locations]
-    y_coords = [loc[1] for loc in all_locations]
-    
-    # Ensure we have valid numeric data
-    if not x_coords or not y_coords:
-        return go.Figure()
+    x_coords = locations[:, 0]
+    y_coords = locations[:, 1]
     
     try:
         # Create 2D histogram
-        x_bins = np.linspace(min(x_coords), max(x_coords), 20)
-        y_bins = np.linspace(min(y_coords), max(y_coords), 20)
+        # Fixed service-area grid unless some deliveries fall outside it
+        x_min, x_max = x_coords.min(), x_coords.max()
+        y_min, y_max = y_coords.min(), y_coords.max()
+        if min(x_min, y_min) >= SERVICE_AREA_EDGES[0] and max(x_max, y_max) <= SERVICE_AREA_EDGES[-1]:
+            x_bins = y_bins = SERVICE_AREA_EDGES
+        else:
+            x_bins = np.linspace(x_min, x_max, HEATMAP_BINS + 1)
+            y_bins = np.linspace(y_min, y_max, HEATMAP_BINS + 1)
         
-        heatmap, x_edges, y_edges = np.histogram2d(x_coords, y_coords, bins=[x_bins, y_bins])
+        heatmap = _bin_locations(x_coords, y_coords, x_bins, y_bins)
         
-        fig = go.Figure(data=go.Heatmap(
+        traces = [dict(
+            type='heatmap',
             z=heatmap.T,
-            x=x_edges[:-1],
-            y=y_edges[:-1],
-            colorscale='Viridis',
-            colorbar=dict(title="Delivery Count")
-        ))
+            x=x_bins[:-1],
+            y=y_bins[:-1],
+            colorscale=HEATMAP_COLORSCALE,
+            colorbar=dict(title=dict(text="Delivery Count"))
+        )]
         
         # Add warehouse location
-        fig.add_trace(go.Scatter(
+        traces.append(dict(
+            type='scatter',
             x=[0], y=[0],
             mode='markers',
             marker=dict(size=15, color='red', symbol='star'),
@@ -340,14 +526,12 @@ def plot_delivery_heatmap(routes: List[Dict]) -> go.Figure:
             showlegend=True
         ))
         
-        fig.update_layout(
-            title="Delivery Density Heatmap",
-            xaxis_title="X Coordinate (km)",
-            yaxis_title="Y Coordinate (km)",
+        return _build_figure(traces, dict(
+            title=dict(text="Delivery Density Heatmap"),
+            xaxis=dict(title=dict(text="X Coordinate (km)")),
+            yaxis=dict(title=dict(text="Y Coordinate (km)")),
             height=500
-        )
-        
-        return fig
+        ))
         
     except (ValueError, TypeError) as e:
         # Return empty figure if there's an error with the data
@@ -366,65 +550,19 @@ def plot_route_efficiency(routes: List[Dict]) -> go.Figure:
         return go.Figure()
     
     # Calculate efficiency metrics
-    efficiency_data = []
-    for route in routes:
-        if not route:
-            continue
-            
-        distance = route.get('total_distance', 0)
-        cost = route.get('total_cost', 0)
-        products = route.get('products_delivered', 0)
-        weight = route.get('total_weight', 0)
-        
-        efficiency_data.append({
-            'vehicle_id': route.get('vehicle_id', 'Unknown'),
-            'cost_per_km': cost / (distance * 1.60934) if distance > 0 else 0,
-            'products_per_km': products / (distance * 1.60934) if distance > 0 else 0,
-            'weight_per_km': weight / (distance * 1.60934) if distance > 0 else 0,
-            'cost_per_product': cost / products if products > 0 else 0
-        })
-    
-    if not efficiency_data:
+    routes_df = _normalize_routes(routes)
+    if routes_df.empty:
         return go.Figure()
     
-    df = pd.DataFrame(efficiency_data)
-    
-    # Create subplots
-    fig = make_subplots(
-        rows=2, cols=2,
-        subplot_titles=('Cost per Km', 'Products per Km', 'Weight per Km', 'Cost per Product'),
-        specs=[[{"type": "bar"}, {"type": "bar"}],
-               [{"type": "bar"}, {"type": "bar"}]]
-    )
-    
-    # Cost per km
-    fig.add_trace(
-        go.Bar(x=df['vehicle_id'], y=df['cost_per_km'], name='Cost/Km (₹)'),
-        row=1, col=1
-    )
-    
-    # Products per km
-    fig.add_trace(
-        go.Bar(x=df['vehicle_id'], y=df['products_per_km'], name='Products/Km'),
-        row=1, col=2
-    )
-    
-    # Weight per km
-    fig.add_trace(
-        go.Bar(x=df['vehicle_id'], y=df['weight_per_km'], name='Weight/Km (kg)'),
-        row=2, col=1
-    )
-    
-    # Cost per product
-    fig.add_trace(
-        go.Bar(x=df['vehicle_id'], y=df['cost_per_product'], name='Cost/Product (₹)'),
-        row=2, col=2
-    )
-    
-    fig.update_layout(
-        title="Route Efficiency Metrics",
-        height=600,
-        showlegend=False
-    )
-    
-    return fig 
\ No newline at end of file
+    distance_km = routes_df['total_distance_km'].to_numpy(dtype=np.float64)
+    cost = routes_df['total_cost'].to_numpy(dtype=np.float64)
+    products = routes_df['products_delivered'].to_numpy(dtype=np.float64)
+    weight = routes_df['total_weight'].to_numpy(dtype=np.float64)
+    has_distance = distance_km > 0
+    
+    return _bar_grid_figure("Route Efficiency Metrics", routes_df['vehicle_id'].to_numpy(), [
+        ('Cost per Km', 'Cost/Km (₹)', np.divide(cost, distance_km, out=np.zeros_like(cost), where=has_distance)),
+        ('Products per Km', 'Products/Km', np.divide(products, distance_km, out=np.zeros_like(products), where=has_distance)),
+        ('Weight per Km', 'Weight/Km (kg)', np.divide(weight, distance_km, out=np.zeros_like(weight), where=has_distance)),
+        ('Cost per Product', 'Cost/Product (₹)', np.divide(cost, products, out=np.zeros_like(cost), where=products > 0)),
+    ])
@@ -1,118 +1,182 @@
 #!/usr/bin/env python3
 """
-Test script to verify the application runs without IndexError
+Tests verifying the application runs without IndexError
 """
 
-import sys
-import os
-sys.path.append('.')
+import json
+import sqlite3
+import threading
+
+import pytest
+
+@pytest.fixture
+def empty_job_db(tmp_path, monkeypatch):
+    """Job database module pointed at a fresh database file for one test"""
+    from utils import job_db
+    monkeypatch.setattr(job_db, 'DB_PATH', str(tmp_path / 'jobs.db'))
+    monkeypatch.setattr(job_db, '_conn', None)
+    job_db.init_db()
+    yield job_db
+    job_db._conn.close()
 
 def test_imports():
     """Test all imports work correctly"""
-    try:
-        from utils.job_db import list_jobs, init_db
-        from agents.dispatch_planner import DispatchPlanner
-        from agents.dynamic_optimizer import DynamicOptimizer
-        from models.ai_trainer import AITrainer
-        from visualizations.route_visualizer import plot_route_map
-        print("✅ All imports successful")
-        return True
-    except Exception as e:
-        print(f"❌ Import error: {e}")
-        return False
+    from utils.job_db import list_jobs, init_db
+    from agents.dispatch_planner import DispatchPlanner
+    from agents.dynamic_optimizer import DynamicOptimizer
+    from models.ai_trainer import AITrainer
+    from visualizations.route_visualizer import plot_route_map
 
-def test_job_db():
-    """Test job database operations"""
-    try:
-        from utils.job_db import list_jobs, init_db
-        init_db()
-        jobs = list_jobs()
-        print(f"✅ Job DB test successful - {len(jobs)} jobs found")
-        return True
-    except Exception as e:
-        print(f"❌ Job DB error: {e}")
-        return False
+def test_job_db(empty_job_db):
+    """Saved jobs are listed newest first and read back whole"""
+    empty_job_db.save_job("Weight\n1\n", {'max_truck_weight': 500}, "Truck #\n1\n")
+    empty_job_db.save_job("Weight\n2\n", {'max_truck_weight': 800}, "Truck #\n2\n")
+    
+    jobs = empty_job_db.list_jobs()
+    assert [len(job) for job in jobs] == [2, 2]
+    newest_id, oldest_id = (job[0] for job in jobs)
+    assert newest_id > oldest_id
+    
+    job = empty_job_db.get_job_by_id(oldest_id)
+    assert job[2:] == ("Weight\n1\n", json.dumps({'max_truck_weight': 500}), "Truck #\n1\n")
 
-def test_analytics_processing():
-    """Test analytics processing with error handling"""
-    try:
-        from utils.job_db import list_jobs, init_db
-        import pandas as pd
-        import json
-        import io
-        
-        init_db()
-        jobs = list_jobs()
-        
-        if jobs:
-            # Test the analytics processing logic
-            job_data = []
-            for job in jobs:
-                try:
-                    # Validate job data structure
-                    if len(job) >= 4:
-                        job_data.append({
-                            'Job ID': job[0],
-                            'Date': job[1],
-                            'Products': len(pd.read_csv(io.StringIO(job[2]))) if job[2] else 0,
-                            'Constraints': json.loads(job[3]) if job[3] else {}
-                        })
-                    else:
-                        # Handle incomplete job data
-                        job_data.append({
-                            'Job ID': job[0] if len(job) > 0 else 'Unknown',
-                            'Date': job[1] if len(job) > 1 else 'Unknown',
-                            'Products': 0,
-                            'Constraints': {}
-                        })
-                except Exception as e:
-                    # Handle any parsing errors
-                    job_data.append({
-                        'Job ID': job[0] if len(job) > 0 else 'Unknown',
-                        'Date': job[1] if len(job) > 1 else 'Unknown',
-                        'Products': 0,
-                        'Constraints': {}
-                    })
-            
-            print(f"✅ Analytics processing successful - {len(job_data)} jobs processed")
-            return True
-        else:
-            print("✅ Analytics processing successful - no jobs to process")
-            return True
-            
-    except Exception as e:
-        print(f"❌ Analytics processing error: {e}")
-        return False
+def test_analytics_processing(empty_job_db):
+    """Job summaries count the products in each input CSV and keep the constraints"""
+    constraints = {'max_truck_weight': 1000, 'fragile_on_top': True}
+    empty_job_db.save_job("Weight,Priority\n1,High\n2,Low\n3,High\n", constraints, "")
+    empty_job_db.save_job("Weight,Priority\n1,High\n2,Low", constraints, "")
+    # Blank lines, including trailing ones, are not products
+    empty_job_db.save_job("\nWeight,Priority\n1,High\n\n \n2,Low\n\n\n", constraints, "")
+    empty_job_db.save_job("", {}, "")
+    
+    summaries = empty_job_db.list_job_summaries()
+    assert [count for _, _, count, _ in summaries] == [None, 2, 2, 3]
+    assert [json.loads(c) for _, _, _, c in summaries] == [{}, constraints, constraints, constraints]
+    assert empty_job_db.get_job_summary(summaries[1][0]) == summaries[1]
 
-def main():
-    """Run all tests"""
-    print("🚚 Testing AI-Powered Dispatch Planning & Space Optimization System")
-    print("=" * 70)
+def test_log_writer_survives_bad_row(tmp_path):
+    """A log row sqlite cannot bind is dropped without stalling the writer or losing its batch"""
+    from agents.dynamic_optimizer import DynamicOptimizer, OPTIMIZATION_INSERT_SQL
+    db_path = str(tmp_path / 'dynamic.db')
+    optimizer = DynamicOptimizer(db_path=db_path)
+    optimizer._buffer_log(OPTIMIZATION_INSERT_SQL, ('full', 1, 1, 1.0, 1.0, 0.1, 'completed'))
+    optimizer._buffer_log(OPTIMIZATION_INSERT_SQL, ('full', 10**30, 1, 1.0, 1.0, 0.1, 'completed'))
+    optimizer._buffer_log(OPTIMIZATION_INSERT_SQL, ('full', 2, 1, 1.0, 1.0, 0.1, 'completed'))
     
-    tests = [
-        ("Import Test", test_imports),
-        ("Job DB Test", test_job_db),
-        ("Analytics Processing Test", test_analytics_processing)
-    ]
+    flusher = threading.Thread(target=optimizer._flush_logs, daemon=True)
+    flusher.start()
+    flusher.join(timeout=10)
+    assert not flusher.is_alive()
     
-    passed = 0
-    total = len(tests)
+    # The writer released its lock, and later rows still get written
+    optimizer._buffer_log(OPTIMIZATION_INSERT_SQL, ('full', 3, 1, 1.0, 1.0, 0.1, 'completed'))
+    optimizer._flush_logs()
+    with sqlite3.connect(db_path, timeout=1) as conn:
+        counts = [row[0] for row in conn.execute("SELECT products_count FROM optimization_history ORDER BY id")]
+    assert counts == [1, 2, 3]
+
+def _training_job(job_id, weight, trucks=1):
+    """Minimal stored job whose single product has the given weight, dispatched on the given trucks"""
+    input_csv = "Weight,Length,Width,Height,Fragile,Priority\n%s,10,10,10,No,High\n" % weight
+    output_csv = "Truck #,Product\n" + "".join("%d,P%d\n" % (truck, truck) for truck in range(1, trucks + 1))
+    return (job_id, '2024-01-01', input_csv, json.dumps({'max_truck_weight': 1000}), output_csv)
+
+def test_train_with_duplicate_jobs():
+    """Training on too few distinct jobs declines instead of raising"""
+    from models.ai_trainer import AITrainer
+    identical = [_training_job(i, 5) for i in range(12)]
+    assert AITrainer().train(identical) is False
+    
+    mostly_identical = identical + [_training_job(12 + i, 7) for i in range(3)]
+    trainer = AITrainer()
+    assert trainer.train(mostly_identical) is False
+    assert not trainer.is_trained
+
+def test_train_on_small_job_set():
+    """A few dozen jobs are enough for predictions that follow the input"""
+    from models.ai_trainer import AITrainer
+    jobs = [_training_job(i, 100 * (i + 1), trucks=i // 5 + 1) for i in range(30)]
+    trainer = AITrainer()
+    assert trainer.train(jobs) is True
     
-    for test_name, test_func in tests:
-        print(f"\n🧪 Running {test_name}...")
-        if test_func():
-            passed += 1
-        else:
-            print(f"❌ {test_name} failed")
+    product = {'Length': 10, 'Width': 10, 'Height': 10, 'Fragile': False, 'Priority': 'High'}
+    light, heavy = trainer.predict_optimization_quality_batch([
+        ([dict(product, Weight=100)], {'max_truck_weight': 1000}),
+        ([dict(product, Weight=3000)], {'max_truck_weight': 1000}),
+    ])
+    assert light['predicted_trucks'] < heavy['predicted_trucks']
+
+def test_feature_cache_is_versioned(tmp_path, monkeypatch):
+    """Cached feature rows are reused, but not across feature extractor versions"""
+    from models import ai_trainer
+    cache_path = str(tmp_path / 'features.pkl')
+    jobs = [_training_job(0, 5)]
+    X, _ = ai_trainer.AITrainer(feature_cache_path=cache_path).prepare_training_data(jobs)
+    
+    # Rows from the cache win over re-parsing while the version is unchanged
+    cache = ai_trainer.joblib.load(cache_path)
+    for row in cache['rows'].values():
+        row[0][0] = -1
+    ai_trainer.joblib.dump(cache, cache_path)
+    cached, _ = ai_trainer.AITrainer(feature_cache_path=cache_path).prepare_training_data(jobs)
+    assert cached[0, 0] == -1
+    
+    monkeypatch.setattr(ai_trainer, 'FEATURE_VERSION', ai_trainer.FEATURE_VERSION + 1)
+    reparsed, _ = ai_trainer.AITrainer(feature_cache_path=cache_path).prepare_training_data(jobs)
+    assert (reparsed == X).all()
+
+def test_two_opt_never_lengthens_tour():
+    """2-opt keeps every stop and returns a closed tour no longer than the one it was given"""
+    import numpy as np
+    from agents.dispatch_planner import _two_opt, _nearest_neighbor_orders, TWO_OPT_MAX_STOPS
+    rng = np.random.default_rng(0)
+    for n in (1, 2, 3, 10, 200, TWO_OPT_MAX_STOPS + 1):
+        coords = rng.uniform(-50, 50, (n, 2))
+        order, legs = _nearest_neighbor_orders([coords])[0]
+        before = legs.sum() + np.hypot(*coords[order[-1]])
+        new_order, new_legs = _two_opt(order, coords)
+        after = new_legs.sum() + np.hypot(*coords[new_order[-1]])
+        assert sorted(new_order) == list(range(n))
+        assert after <= before + 1e-9
+
+def test_routes_keep_product_fields():
+    """Planned routes carry the products' own fields, and hand-built products can be planned"""
+    from datetime import datetime
+    from agents.dispatch_planner import DispatchPlanner
+    planner = DispatchPlanner(seed=0)
+    planner.add_vehicle('V1', 1000, 10000, 10, 5)
+    planner.add_driver('D1', 'Driver', 8, 100)
+    products = [{'Product': 'P%d' % i, 'Weight': 10, 'Length': 2, 'Width': 3, 'Height': 4, 'Priority': 'High'}
+                for i in range(3)]
+    
+    routes = planner.optimize_routes(planner.assign_delivery_locations(products), {})
+    for route in routes:
+        for stop in route['route']:
+            assert '_volume' not in stop['product']
+    assert sum(route['total_volume'] for route in routes) == 3 * 24
+    
+    # Products with locations but no generated planning fields beyond those the planner needs
+    window = datetime.now()
+    manual = [{'Weight': 10, 'delivery_location': (1.0, 2.0), 'delivery_window_start': window,
+               'service_time': 0.5, 'priority_score': 1.0}]
+    route, = planner.optimize_routes(manual, {})
+    assert route['total_volume'] == 0
+
+def test_bulk_job_queries_many_ids(empty_job_db):
+    """Bulk fetches and deletes are not limited by how many parameters SQLite binds per query"""
+    with empty_job_db._connection() as conn:
+        # Old SQLite builds allow only 999 parameters per statement
+        conn.setlimit(sqlite3.SQLITE_LIMIT_VARIABLE_NUMBER, 999)
+        conn.executemany("INSERT INTO jobs (timestamp, input_csv, constraints, output_csv) VALUES (?, '', '{}', '')",
+                         [('2024-01-01',)] * 2000)
+        conn.commit()
+    ids = [job_id for job_id, _ in empty_job_db.list_jobs()]
     
-    print(f"\n📊 Test Results: {passed}/{total} tests passed")
+    rows = empty_job_db.get_jobs_bulk(job_id for job_id in reversed(ids))
+    assert [row[0] for row in rows] == ids
     
-    if passed == total:
-        print("🎉 All tests passed! The application should run without IndexError.")
-        print("\n🚀 You can now run the application with:")
-        print("   streamlit run ui/app.py")
-    else:
-        print("⚠️  Some tests failed. Please check the errors above.")
+    empty_job_db.delete_jobs_by_ids(ids[:1500])
+    assert [job_id for job_id, _ in empty_job_db.list_jobs()] == ids[1500:]
 
 if __name__ == "__main__":
-    main() 
\ No newline at end of file
+    raise SystemExit(pytest.main([__file__]))